@@ -0,0 +1,100 @@
+"""TaskListPanel.refresh after a one-task edit: whole data list replaced vs keyed reconcile.
+
+    python benchmarks/bench_list_refresh.py [N ...]
+
+rebuild    — ``rv.data`` replaced with fresh rows (every visible row is rebound and the
+             whole layout recomputed)
+reconcile  — ``TaskListPanel.refresh()``: taskDiff against the current rows, only the
+             edited row is rewritten and only its widget rebound
+
+Each sample edits the title of a task that is on screen, then times the refresh call and
+the next frame (layout, label rendering, drawing) separately. Needs Kivy and KivyMD;
+opens a 400x700 window.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+SAMPLES = 20
+
+
+def make_store(n):
+    data_dir = tempfile.mkdtemp()
+    now = int(time.time())
+    tasks = [{"id": i, "title": f"Задача {i}", "project": f"Проект {i % 7}", "description": "описание " * (i % 5 + 1),
+              "start_time": now + i * 600, "end_time": now + i * 600 + 300, "state": "next"}
+             for i in range(1, n + 1)]
+    with open(os.path.join(data_dir, "tasks.json"), "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False)
+    with open(os.path.join(data_dir, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"notification_backend": "memory", "archive_after_days": None}, f)
+    return data_dir
+
+
+def main(sizes):
+    try:
+        from kivy.base import EventLoop
+        from kivy.clock import Clock
+        from kivy.core.window import Window
+        import main as ui
+    except ImportError as e:
+        print("Kivy/KivyMD are not installed:", e)
+        return 1
+    import taskManager
+
+    # без ограничения fps: кадр занимает ровно столько, сколько работы
+    Clock._max_fps = 0
+    Window.size = (400, 700)
+
+    def frame():
+        Clock.tick()
+        EventLoop.idle()
+
+    rebinds = []
+    original = ui.STaskCard.refresh_view_attrs
+
+    def counting(view, rv, index, data):
+        rebinds.append(index)
+        return original(view, rv, index, data)
+
+    ui.STaskCard.refresh_view_attrs = counting
+
+    print(f"{'tasks':>6} {'variant':>10} {'refresh, ms':>12} {'frame, ms':>10} {'rows rebound':>13}")
+    for n in sizes:
+        os.environ["TASK_MANAGER_DATA_DIR"] = make_store(n)
+        taskManager._initialized = False
+        taskManager.initialize()
+        panel = ui.TaskListPanel()
+        Window.add_widget(panel)
+        panel.size = Window.size
+        for _ in range(3):
+            frame()
+        rv = panel.rv
+        for name, refresh in (("rebuild", lambda: setattr(rv, "data", [rv._row(t) for t in taskManager.get_tasks()])),
+                              ("reconcile", panel.refresh)):
+            calls, frames = [], []
+            rebinds.clear()
+            for k in range(SAMPLES):
+                taskManager.edit_task(3, title=f"Задача 3 ({name} {k})")
+                t = time.perf_counter()
+                refresh()
+                t1 = time.perf_counter()
+                frame()
+                calls.append(t1 - t)
+                frames.append(time.perf_counter() - t1)
+            print(f"{n:>6} {name:>10} {statistics.median(calls) * 1000:>12.2f} {statistics.median(frames) * 1000:>10.1f}"
+                  f" {len(rebinds) / SAMPLES:>13.1f}")
+        Window.remove_widget(panel)
+    taskManager.stop_manager()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main([int(a) for a in sys.argv[1:]] or [100, 1000, 5000]))
@@ -0,0 +1,55 @@
+"""Memory of N tasks: legacy dict layout vs TaskRecord.
+
+    python benchmarks/bench_memory.py [N ...]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskModel import TaskRecord
+
+PROJECTS = ["Учёба", "Работа", "Дом", "Спорт", "Проект X"]
+
+
+def make_dict(i, now):
+    # так задача выглядела в памяти после первого прохода _check_all_tasks;
+    # "".join даёт отдельную копию строки, как после json.load
+    return {
+        "id": i,
+        "title": f"Задача {i}",
+        "project": "".join(PROJECTS[i % len(PROJECTS)]),
+        "description": "",
+        "start_time": now + i * 60,
+        "end_time": now + i * 60 + 3600,
+        "started": False,
+        "state": "".join("completed"),
+        "created": now,
+        "completed_time": now + i * 60 + 1800,
+        "reminders_sent": {"r15": now, "r10": now, "r5": now},
+        "missed_notifications": {},
+    }
+
+
+def measure(factory, n):
+    now = int(time.time())
+    tracemalloc.start()
+    items = [factory(make_dict(i, now)) for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return size
+
+
+def main(sizes):
+    print(f"{'tasks':>8} {'dict, MB':>10} {'record, MB':>11} {'ratio':>6}")
+    for n in sizes:
+        legacy = measure(lambda d: d, n)
+        compact = measure(TaskRecord.from_dict, n)
+        print(f"{n:>8} {legacy / 2 ** 20:>10.1f} {compact / 2 ** 20:>11.1f} {legacy / compact:>6.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
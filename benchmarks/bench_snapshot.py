@@ -0,0 +1,81 @@
+"""Save/load time and size of the task snapshot: tasks.json (indent=4) vs tasks.bin.
+
+    python benchmarks/bench_snapshot.py [N ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskModel import TaskRecord
+from taskSnapshot import BinarySnapshot, write_snapshot
+
+STATES = ("completed", "completed", "completed_overdue", "next", "active")
+
+
+def make_data(n):
+    now = int(time.time())
+    tasks = []
+    for i in range(n):
+        tasks.append(TaskRecord(
+            id=i + 1, title=f"Задача {i}", project=f"Проект {i % 7}", description="Описание " * (i % 5),
+            start_time=now + i * 60, end_time=now + i * 60 + 3600, started=i % 2 == 0,
+            state=STATES[i % len(STATES)], created=now, completed_time=now + 10, flags=i % 128,
+        ))
+    tasks.sort(key=lambda t: t.state not in ("active", "next"))
+    hot = sum(1 for t in tasks if t.state in ("active", "next"))
+    return {"version": 1, "seq": 0, "hot": hot, "max_id": n, "tasks": [t.to_dict() for t in tasks]}
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t, result
+
+
+def main(sizes):
+    d = tempfile.mkdtemp()
+    json_path = os.path.join(d, "tasks.json")
+    bin_path = os.path.join(d, "tasks.bin")
+    print(f"{'tasks':>8} {'fmt':>5} {'size, KB':>9} {'save, ms':>9} {'load, ms':>9} {'first 50, ms':>13}")
+    for n in sizes:
+        data = make_data(n)
+
+        def save_json():
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+
+        def load_json():
+            with open(json_path, "r", encoding="utf-8") as f:
+                return [TaskRecord.from_dict(t) for t in json.load(f)["tasks"]]
+
+        def load_bin():
+            snap = BinarySnapshot(bin_path)
+            try:
+                return list(snap)
+            finally:
+                snap.close()
+
+        def load_bin_head():
+            snap = BinarySnapshot(bin_path)
+            try:
+                return [snap.row(r) for r in range(min(50, len(snap)))]
+            finally:
+                snap.close()
+
+        save_t, _ = timed(save_json)
+        load_t, _ = timed(load_json)
+        print(f"{n:>8} {'json':>5} {os.path.getsize(json_path) / 1024:>9.0f} {save_t * 1e3:>9.1f} "
+              f"{load_t * 1e3:>9.1f} {load_t * 1e3:>13.1f}")
+        save_t, _ = timed(lambda: write_snapshot(bin_path, data))
+        load_t, _ = timed(load_bin)
+        head_t, _ = timed(load_bin_head)
+        print(f"{n:>8} {'bin':>5} {os.path.getsize(bin_path) / 1024:>9.0f} {save_t * 1e3:>9.1f} "
+              f"{load_t * 1e3:>9.1f} {head_t * 1e3:>13.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,68 @@
+"""Startup time and peak RSS: headless serve vs the UI stack.
+
+    python benchmarks/bench_startup.py [N]
+
+headless — ``python -m taskManager serve --once`` on a store with N tasks
+ui       — the Kivy/KivyMD modules main.py imports (no window is opened) plus the same load
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UI_IMPORTS = """
+import kivy.app, kivy.uix.boxlayout, kivy.uix.floatlayout, kivy.uix.scrollview, kivy.uix.label, kivy.uix.textinput
+import kivy.graphics, kivy.animation, kivy.clock
+import kivymd.app, kivymd.uix.button, kivymd.uix.dialog, kivymd.uix.pickers, kivymd.uix.selectioncontrol, kivymd.uix.textfield
+import taskManager
+taskManager.initialize()
+taskManager.flush()
+"""
+
+
+def make_store(directory, n):
+    now = int(time.time())
+    tasks = [{"id": i, "title": f"Задача {i}", "project": f"Проект {i % 7}", "description": "",
+              "start_time": now + i * 60, "end_time": now + i * 60 + 3600,
+              "state": "next" if i % 10 == 0 else "completed", "completed_time": now}
+             for i in range(1, n + 1)]
+    with open(os.path.join(directory, "tasks.json"), "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False)
+    with open(os.path.join(directory, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"notification_backend": "memory", "archive_after_days": None}, f)
+
+
+def measure(args, data_dir):
+    env = dict(os.environ, TASK_MANAGER_DATA_DIR=data_dir, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    with tempfile.TemporaryFile() as err:
+        t = time.perf_counter()
+        proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=err)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - t
+        if status:
+            err.seek(0)
+            return None, err.read().decode(errors="replace").strip().splitlines()[-1:]
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return (elapsed, rss_mb), None
+
+
+def main(n):
+    print(f"{'variant':>9} {'start, ms':>10} {'peak RSS, MB':>13}   ({n} tasks)")
+    for name, args in (("headless", [sys.executable, "-m", "taskManager", "serve", "--once"]),
+                       ("ui", [sys.executable, "-c", UI_IMPORTS])):
+        data_dir = tempfile.mkdtemp()
+        make_store(data_dir, n)
+        result, error = measure(args, data_dir)
+        if result is None:
+            print(f"{name:>9} failed: {' '.join(error)}")
+        else:
+            print(f"{name:>9} {result[0] * 1000:>10.0f} {result[1]:>13.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
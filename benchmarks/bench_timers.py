@@ -0,0 +1,211 @@
+"""Reminder bookkeeping cost: full scan every tick vs deadline heap vs timing wheel.
+
+    python benchmarks/bench_timers.py [N ...]
+
+scan   — what the old 20 s loop did: every tick compares every task with all of its thresholds
+heap   — DeadlineQueue below, one next-fire time per task on a min-heap
+wheel  — taskScheduler.TimingWheel with what taskManager registers: one timer per kind in
+         TIMER_KINDS (next reminder, start, next overdue repeat), up to three per task
+
+Both queues get the same timers from next_timers() and re-arm a task after it fires.
+Columns: registering all tasks (what _reschedule_all pays at load), one tick when nothing
+is due, simulating an hour of 20 s ticks, and one edit of a task — cancel and re-register,
+as _register_timers does.
+"""
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskModel import TaskRecord
+from taskScheduler import TimingWheel
+
+LADDER = (("r15", -15 * 60), ("r10", -10 * 60), ("r5", -5 * 60), ("start", 0))
+OVERDUE = (("missed", 0), ("o5", 5 * 60), ("o10", 10 * 60), ("o15", 15 * 60))
+
+
+class DeadlineQueue:
+    """Next fire time per task on a min-heap.
+
+    One live deadline per key: ``push`` replaces it, ``cancel`` drops it. Replaced and
+    cancelled heap entries are skipped lazily when they reach the top, so both are
+    O(log n) / O(1) and ``pop_due`` costs O(log n) per fired key.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._when = {}
+
+    def __len__(self):
+        return len(self._when)
+
+    def __contains__(self, key):
+        return key in self._when
+
+    def push(self, key, when):
+        if self._when.get(key) == when:
+            return
+        self._when[key] = when
+        heapq.heappush(self._heap, (when, key))
+        if len(self._heap) > 2 * len(self._when) + 64:
+            self._rebuild()
+
+    def cancel(self, key):
+        self._when.pop(key, None)
+
+    def clear(self):
+        self._heap = []
+        self._when = {}
+
+    def next_time(self):
+        heap = self._heap
+        while heap and self._when.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now):
+        """Keys whose deadline is ``<= now``, earliest first."""
+        due = []
+        while True:
+            when = self.next_time()
+            if when is None or when > now:
+                return due
+            _, key = heapq.heappop(self._heap)
+            del self._when[key]
+            due.append(key)
+
+    def _rebuild(self):
+        # выкидываем устаревшие записи, иначе куча растёт при частых правках
+        self._heap = [(w, k) for k, w in self._when.items()]
+        heapq.heapify(self._heap)
+
+
+def make_tasks(n, now):
+    rnd = random.Random(n)
+    tasks = {}
+    for i in range(1, n + 1):
+        start = now + rnd.randint(-3 * 86400, 30 * 86400)
+        tasks[i] = TaskRecord(id=i, title=f"t{i}", project="p", state="next",
+                              start_time=start, end_time=start + rnd.randint(600, 8 * 3600))
+    return tasks
+
+
+def timers_of(task):
+    for key, off in LADDER:
+        yield key, task.start_time + off
+    for key, off in OVERDUE:
+        yield key, task.end_time + off
+    yield "hourly", task.end_time + 15 * 60
+
+
+# как taskManager.TIMER_KINDS
+TIMER_KINDS = ("reminder", "start", "repeat")
+
+
+def next_timers(task, after):
+    """(kind, time) of the timers taskManager would hold for ``task`` at ``after``."""
+    reminders = [when for key, when in timers_of(task) if key not in ("start", "hourly") and when > after]
+    if reminders:
+        yield "reminder", min(reminders)
+    if task.start_time > after:
+        yield "start", task.start_time
+    base = task.end_time + 15 * 60
+    yield "repeat", base if after < base else base + ((after - base) // 3600 + 1) * 3600
+
+
+def scan_tick(tasks, now):
+    # те же сравнения, что делал _check_all_tasks на каждом проходе
+    due = 0
+    for task in tasks.values():
+        start_time, end_time = task.start_time, task.end_time
+        if task.state == "next":
+            for key, off in LADDER:
+                if now >= start_time + off and (key == "start" or not task.has_flag(key)):
+                    due += 1
+        if now >= end_time:
+            for key, off in OVERDUE:
+                if now >= end_time + off and not task.has_flag(key):
+                    due += 1
+    return due
+
+
+def bench_scan(tasks, now):
+    t = time.perf_counter()
+    scan_tick(tasks, now - 10 ** 9)
+    idle = time.perf_counter() - t
+    t = time.perf_counter()
+    for step in range(180):
+        scan_tick(tasks, now + step * 20)
+    hour = time.perf_counter() - t
+    return 0.0, idle, hour, 0.0
+
+
+def bench_heap(tasks, now):
+    q = DeadlineQueue()
+    t = time.perf_counter()
+    for task_id, task in tasks.items():
+        q.push(task_id, min(when for _, when in next_timers(task, now)))
+    register = time.perf_counter() - t
+    t = time.perf_counter()
+    q.pop_due(now - 10 ** 9)
+    q.next_time()
+    idle = time.perf_counter() - t
+    t = time.perf_counter()
+    for step in range(180):
+        tick = now + step * 20
+        for task_id in q.pop_due(tick):
+            q.push(task_id, min(when for _, when in next_timers(tasks[task_id], tick)))
+    hour = time.perf_counter() - t
+    t = time.perf_counter()
+    for task_id in range(1, 1001):
+        q.cancel(task_id)
+        q.push(task_id, min(when for _, when in next_timers(tasks[task_id], now)) + 86400)
+    edit = (time.perf_counter() - t) / 1000
+    return register, idle, hour, edit
+
+
+def bench_wheel(tasks, now):
+    w = TimingWheel(now)
+    t = time.perf_counter()
+    for task_id, task in tasks.items():
+        for kind, when in next_timers(task, now):
+            w.insert((task_id, kind), when)
+    register = time.perf_counter() - t
+    w.advance(now)
+    t = time.perf_counter()
+    w.advance(now)
+    w.next_time()
+    idle = time.perf_counter() - t
+    t = time.perf_counter()
+    for step in range(180):
+        tick = now + step * 20
+        for task_id, kind in w.advance(tick):
+            when = dict(next_timers(tasks[task_id], tick)).get(kind)
+            if when is not None:
+                w.insert((task_id, kind), when)
+    hour = time.perf_counter() - t
+    t = time.perf_counter()
+    for task_id in range(1, 1001):
+        for kind in TIMER_KINDS:
+            w.cancel((task_id, kind))
+        for kind, when in next_timers(tasks[task_id], now):
+            w.insert((task_id, kind), when + 86400)
+    edit = (time.perf_counter() - t) / 1000
+    return register, idle, hour, edit
+
+
+def main(sizes):
+    now = int(time.time())
+    print(f"{'tasks':>8} {'impl':>6} {'register, ms':>13} {'idle tick, ms':>14} {'1 h of ticks, ms':>17} {'edit, us':>9}")
+    for n in sizes:
+        tasks = make_tasks(n, now)
+        for name, fn in (("scan", bench_scan), ("heap", bench_heap), ("wheel", bench_wheel)):
+            register, idle, hour, edit = fn(tasks, now)
+            print(f"{n:>8} {name:>6} {register * 1000:>13.1f} {idle * 1000:>14.3f} {hour * 1000:>17.1f} {edit * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10000, 100000])
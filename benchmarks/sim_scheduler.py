@@ -0,0 +1,121 @@
+"""Time-travel simulation of the reminder scheduler.
+
+    python benchmarks/sim_scheduler.py [--tasks N] [--span DAYS] [--days D] [--suspend HOURS] [--seed S]
+
+N tasks spread over --span days (default: --days) are written to a fresh store and
+loaded the way the app loads them. taskManager runs on a VirtualClock: the manager loop is replayed at full speed (after
+each pass the clock jumps exactly as far as the real loop would sleep), a simulated user
+finishes most tasks some time after they start (some late, some never), and once a day
+the device can "sleep" for --suspend hours. Per simulated day it prints scheduler passes,
+reminders fired, notifications submitted, journal writes, lateness and CPU time.
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DAY = 86400
+
+
+def setup(data_dir):
+    os.environ["TASK_MANAGER_DATA_DIR"] = data_dir
+    with open(os.path.join(data_dir, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"notification_backend": "memory", "notification_rate_limit": None,
+                   "write_behind_window": 0.05}, f)
+
+
+def make_tasks(data_dir, rnd, n, start, days):
+    # задачи идут друг за другом, как у живого пользователя; действия — когда он их закрывает
+    tasks, actions = [], []
+    interval = days * DAY / n
+    for i in range(n):
+        begin = int(start + 600 + i * interval)
+        end = begin + max(int(interval * 0.8), 60)
+        tasks.append({"id": i + 1, "title": f"Задача {i}", "project": f"Проект {i % 5}", "description": "",
+                      "start_time": begin, "end_time": end, "started": False, "state": "next", "created": start})
+        r = rnd.random()
+        if r < 0.1:
+            continue
+        done_at = begin + int((end - begin) * (rnd.uniform(0.3, 1.0) if r < 0.8 else rnd.uniform(1.0, 3.0)))
+        actions.append((done_at, i + 1))
+    with open(os.path.join(data_dir, "tasks.json"), "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False)
+    heapq.heapify(actions)
+    return actions
+
+
+def complete(tm, task_id, now):
+    task = tm.get_task(task_id)
+    if task is None or task.get("state") in ("completed", "completed_overdue"):
+        return
+    late = now > (task.get("end_time") or now)
+    tm.edit_task(task_id, state="completed_overdue" if late else "completed", completed_time=now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--span", type=int, help="days the tasks are spread over (default: --days)")
+    parser.add_argument("--suspend", type=float, default=0, help="hours the device sleeps once a day")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    setup(data_dir)
+    rnd = random.Random(args.seed)
+    start = 1_700_000_000
+    actions = make_tasks(data_dir, rnd, args.tasks, start, args.span or args.days)
+
+    import taskManager as tm
+    from taskScheduler import VirtualClock
+
+    clock = VirtualClock(start)
+    tm.set_clock(clock)
+    t = time.perf_counter()
+    tm.initialize()
+    print(f"load: {args.tasks} tasks in {(time.perf_counter() - t) * 1000:.0f} ms")
+
+    print(f"{'day':>4} {'passes':>7} {'checked':>8} {'fired':>6} {'notified':>9} {'writes':>7} "
+          f"{'late avg, s':>12} {'late max, s':>12} {'CPU, ms':>8}")
+    end = start + args.days * DAY
+    day_end = start + DAY
+    next_suspend = start + DAY / 2 if args.suspend else None
+    prev = dict(tm.scheduler_stats(), notified=0)
+    cpu = time.process_time()
+    day = 1
+    while clock.time() < end:
+        timeout = tm._manager_step()
+        target = min(clock.time() + timeout, actions[0][0] if actions else end, end)
+        if next_suspend is not None and next_suspend <= target:
+            # устройство спит: ни планировщик, ни пользователь ничего не делают
+            target = next_suspend + args.suspend * 3600
+            next_suspend += DAY
+        clock.set(target)
+        while actions and actions[0][0] <= clock.time():
+            _, task_id = heapq.heappop(actions)
+            complete(tm, task_id, tm._now())
+        while clock.time() >= day_end and day <= args.days:
+            stats = dict(tm.scheduler_stats(), notified=tm.notification_stats().get("queued", 0))
+            d = {k: stats[k] - prev[k] for k in stats if k != "late_max"}
+            now_cpu = time.process_time()
+            late_avg = d["late_total"] / d["fired"] if d["fired"] else 0
+            print(f"{day:>4} {d['passes']:>7} {d['checked']:>8} {d['fired']:>6} {d['notified']:>9} {d['writes']:>7} "
+                  f"{late_avg:>12.1f} {stats['late_max']:>12} {(now_cpu - cpu) * 1000:>8.0f}")
+            # максимум опоздания считаем по дням
+            tm._stats["late_max"] = 0
+            prev, cpu = stats, now_cpu
+            day += 1
+            day_end += DAY
+    tm.flush()
+    tm._close_dispatcher()
+
+
+if __name__ == "__main__":
+    main()
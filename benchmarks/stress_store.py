@@ -0,0 +1,90 @@
+"""Concurrency stress for taskManager: writer threads vs lock-free readers.
+
+Writers rewrite title and description of random tasks to the same token in one
+edit_task() call and run the reminder pass; readers walk get_tasks() / get_task() and
+fail if they ever see a task whose title and description disagree (torn write) or a
+snapshot that changes under them.
+
+    python benchmarks/stress_store.py [seconds]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["HOME"] = tempfile.mkdtemp()
+
+import taskManager
+
+N_TASKS = 2000
+errors = []
+stats = {"reads": 0, "writes": 0, "passes": 0}
+
+
+def writer(stop, seed):
+    rnd = random.Random(seed)
+    now = int(time.time())
+    while not stop.is_set():
+        ids = [t.id for t in taskManager.get_tasks()]
+        task_id = rnd.choice(ids)
+        token = f"{seed}-{rnd.random()}"
+        taskManager.edit_task(task_id, title=token, description=token)
+        if rnd.random() < 0.05:
+            t = taskManager.add_task("new", "stress", "new", now - 600, now + 600)
+            taskManager.delete_task(t.id)
+        stats["writes"] += 1
+
+
+def scheduler(stop):
+    while not stop.is_set():
+        taskManager._check_all_tasks()
+        stats["passes"] += 1
+
+
+def reader(stop):
+    while not stop.is_set():
+        snapshot = taskManager.get_tasks()
+        before = [(t.get("title"), t.get("state"), t.flags) for t in snapshot]
+        for t in snapshot:
+            if t.get("title") != t.get("description"):
+                errors.append(f"torn task {t.id}: {t.get('title')!r} / {t.get('description')!r}")
+            if t.get("state") == "active" and not t.get("started"):
+                errors.append(f"task {t.id} active but not started")
+        after = [(t.get("title"), t.get("state"), t.flags) for t in snapshot]
+        if before != after:
+            errors.append("snapshot changed while being read")
+        one = taskManager.get_task(random.choice(snapshot).id)
+        if one is not None and one.get("title") != one.get("description"):
+            errors.append(f"torn get_task {one.id}")
+        stats["reads"] += 1
+
+
+def main(seconds):
+    taskManager.initialize()
+    now = int(time.time())
+    for i in range(N_TASKS):
+        offset = random.randint(-7200, 7200)
+        taskManager.add_task(str(i), "stress", str(i), now + offset, now + offset + 1800)
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(stop, s)) for s in range(3)]
+    threads += [threading.Thread(target=scheduler, args=(stop,))]
+    threads += [threading.Thread(target=reader, args=(stop,)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    taskManager.flush()
+    print(f"reads={stats['reads']} writes={stats['writes']} scheduler passes={stats['passes']}")
+    if errors:
+        print(f"FAILED: {len(errors)} inconsistencies, first: {errors[0]}")
+        sys.exit(1)
+    print("OK: no torn reads")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
@@ -1,9 +1,11 @@
+import asyncio
 import datetime
 import json
 import os
 import sys
 import time
 import traceback
+import weakref
 
 from kivy import Config
 from kivy.app import App
@@ -14,6 +16,9 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.textinput import TextInput
 from kivy.uix.widget import Widget
@@ -29,7 +34,7 @@ from kivymd.uix.button import MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.pickers import MDTimePicker, MDDatePicker
 import logging
-from settings import is_notifications_enabled, load_settings, save_settings, get_settings_file
+from settings import is_notifications_enabled, load_settings, save_settings, get_settings_file, get_manager_runtime
 
 from kivymd.uix.selectioncontrol import MDSwitch
 from kivymd.uix.textfield import MDTextField
@@ -39,7 +44,9 @@ logging.basicConfig(level=logging.DEBUG)
 BASEMENT_DIR = os.path.dirname(os.path.abspath(__file__))
 FONTS_DIR = os.path.join(BASEMENT_DIR, "assets", "fonts")
 
+import taskDiff
 import taskManager
+import taskRecurrence
 
 LabelBase.register(
     name='Emojis',
@@ -59,8 +66,188 @@ sys.excepthook = exception_handler
 Window.clearcolor = (1, 0, 1, 1)
 
 
+PENDING_STATES = ('active', 'next')
+
+
+def _mounted(widget):
+    # виджет в дереве окна и ни он, ни предки не скрыты прозрачностью
+    w = widget
+    while w is not None and w is not Window:
+        if w.opacity == 0:
+            return False
+        w = w.parent
+    return w is Window
+
+
+def _inside(widget, ancestor):
+    w = widget
+    while w is not None and w is not ancestor and w is not Window:
+        w = w.parent
+    return w is ancestor
+
+
+def _on_screen(widget):
+    if not _mounted(widget):
+        return False
+    x0, y0 = widget.to_window(widget.x, widget.y)
+    x1, y1 = widget.to_window(widget.right, widget.top)
+    return min(x0, x1) < Window.width and max(x0, x1) > 0 and min(y0, y1) < Window.height and max(y0, y1) > 0
+
+
+class HoverDispatcher:
+    """One Window.mouse_pos handler for every RoundedBtn.
+
+    Buttons register themselves weakly when they get a parent, so discarded buttons are
+    collected. Mounted, visible buttons are bucketed by their window rectangle in a coarse
+    grid; the grid is rebuilt lazily after something that can move a button changes (its
+    own pos/size/parent/opacity, an ancestor's pos or opacity, a ScrollView scroll, the
+    window size), so a mouse move costs one cell lookup and enter/leave go only to the
+    buttons whose hover state changed. The grid and the hovered set hold buttons weakly.
+    """
+    CELL = dp(64)
+
+    def __init__(self):
+        self._buttons = weakref.WeakSet()
+        self._watched = weakref.WeakSet()
+        self._grid = {}
+        self._dirty = True
+        self._hovered = weakref.WeakSet()
+        self._bound = False
+
+    def register(self, btn):
+        if btn not in self._buttons:
+            self._buttons.add(btn)
+            btn.fbind('pos', self._invalidate)
+            btn.fbind('size', self._invalidate)
+            btn.fbind('opacity', self._invalidate)
+            btn.fbind('disabled', self._invalidate)
+        self._dirty = True
+        if not self._bound:
+            Window.bind(mouse_pos=self._on_mouse_pos, size=self._invalidate)
+            self._bound = True
+
+    def unmount(self, btn):
+        # снятая с экрана кнопка не должна остаться подсвеченной
+        self._dirty = True
+        if btn in self._hovered:
+            self._hovered.discard(btn)
+            btn.dispatch('on_leave')
+
+    def _invalidate(self, *a):
+        self._dirty = True
+
+    def _watch_ancestors(self, btn):
+        # ScrollView сдвигает содержимое без смены pos детей, поэтому следим и за прокруткой
+        w = btn.parent
+        while w is not None and w is not Window and w not in self._watched:
+            self._watched.add(w)
+            w.fbind('pos', self._invalidate)
+            w.fbind('opacity', self._invalidate)
+            if isinstance(w, ScrollView):
+                w.fbind('scroll_x', self._invalidate)
+                w.fbind('scroll_y', self._invalidate)
+            w = w.parent
+
+    def _rebuild(self):
+        grid = {}
+        cell = self.CELL
+        for btn in list(self._buttons):
+            if btn.disabled or not _mounted(btn):
+                continue
+            self._watch_ancestors(btn)
+            x0, y0 = btn.to_window(btn.x, btn.y)
+            x1, y1 = btn.to_window(btn.right, btn.top)
+            rect = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+            ref = weakref.ref(btn)
+            for cx in range(int(rect[0] // cell), int(rect[2] // cell) + 1):
+                for cy in range(int(rect[1] // cell), int(rect[3] // cell) + 1):
+                    grid.setdefault((cx, cy), []).append((rect, ref))
+        self._grid = grid
+        self._dirty = False
+
+    def _on_mouse_pos(self, window, pos):
+        if self._dirty:
+            self._rebuild()
+        x, y = pos
+        under = set()
+        for (x0, y0, x1, y1), ref in self._grid.get((int(x // self.CELL), int(y // self.CELL)), ()):
+            btn = ref()
+            if btn is not None and x0 <= x <= x1 and y0 <= y <= y1:
+                under.add(btn)
+        hovered = set(self._hovered)
+        if under == hovered:
+            return
+        self._hovered = weakref.WeakSet(under)
+        for btn in hovered - under:
+            btn.dispatch('on_leave')
+        for btn in under - hovered:
+            btn.dispatch('on_enter')
+
+
+hover = HoverDispatcher()
+
+
+class MinuteTicker:
+    """Updates relative time labels ("Осталось 5м", "Начало через 1ч") once a minute.
+
+    Cards showing an unfinished task are watched while they are mounted; on each minute
+    boundary the ones on screen get ``tick(now)`` in one batch with one timestamp.
+    Completed and detached cards are not in the set at all. Cards refresh their label
+    themselves when mounted; ``refresh`` catches up a panel that is about to be shown.
+    """
+
+    def __init__(self):
+        self._cards = weakref.WeakSet()
+        self._event = None
+
+    def watch(self, card, on=True):
+        if not on:
+            self._cards.discard(card)
+            return
+        self._cards.add(card)
+        if self._event is None:
+            self._schedule()
+
+    def _schedule(self):
+        # чуть позже границы минуты, чтобы разница уже округлялась по-новому
+        self._event = Clock.schedule_once(self._tick, 60 - time.time() % 60 + 0.05)
+
+    def refresh(self, within=None):
+        """Ticks the watched cards under ``within`` (on screen if None) right now."""
+        now = int(time.time())
+        for card in list(self._cards):
+            if _on_screen(card) if within is None else _inside(card, within):
+                card.tick(now)
+
+    def _tick(self, dt):
+        self._event = None
+        if not self._cards:
+            return
+        now = int(time.time())
+        for card in [c for c in self._cards if _on_screen(c)]:
+            card.tick(now)
+        self._schedule()
+
+
+ticker = MinuteTicker()
+
+
+def _scaled(rgba, k, alpha=1.0):
+    return (min(1.0, rgba[0] * k), min(1.0, rgba[1] * k), min(1.0, rgba[2] * k), rgba[3] * alpha)
+
+
 class RoundedBtn(Button):
+    __events__ = ('on_enter', 'on_leave')
+
     def __init__(self, bg=(0.2, 0.5, 0.9, 1), radius=dp(16), **kw):
+        # цвета состояний считаются один раз, переходы между ними — просто смена rgba
+        self._colors = {
+            "normal": tuple(bg),
+            "hover": _scaled(bg, 1.15),
+            "pressed": _scaled(bg, 0.7),
+            "disabled": _scaled(bg, 0.5, 0.7),
+        }
+        self._col = None
         super().__init__(**kw)
         self.background_normal = ''
         self.background_down = ''
@@ -71,31 +258,30 @@ class RoundedBtn(Button):
         self._radius = [radius] if not isinstance(radius, (list, tuple)) else radius
         self._is_hovered = False
         self._is_pressed = False
-        self._current_anim = None
 
         with self.canvas.before:
-            self._col = Color(*self._bg)
+            self._col = Color(*self._colors["disabled" if self.disabled else "normal"])
             self._rect = RoundedRectangle(pos=self.pos, size=self.size, radius=self._radius)
 
         self.bind(pos=self._u, size=self._u)
-        Window.bind(mouse_pos=self._on_mouse_pos)
+
+    def on_parent(self, instance, parent):
+        if parent is not None:
+            hover.register(self)
+        else:
+            hover.unmount(self)
 
     def _u(self, *a):
         self._rect.pos = self.pos
         self._rect.size = self.size
 
-    def _on_mouse_pos(self, window, pos):
-        if self.disabled:
-            return
+    def on_enter(self):
+        self._is_hovered = True
+        self._update_color()
 
-        if self.collide_point(*self.to_widget(*pos)):
-            if not self._is_hovered:
-                self._is_hovered = True
-                self._update_color()
-        else:
-            if self._is_hovered:
-                self._is_hovered = False
-                self._update_color()
+    def on_leave(self):
+        self._is_hovered = False
+        self._update_color()
 
     def on_touch_down(self, touch):
         if self.collide_point(*touch.pos) and not self.disabled:
@@ -110,39 +296,17 @@ class RoundedBtn(Button):
         return super().on_touch_up(touch)
 
     def _update_color(self):
-        if self._current_anim:
-            self._current_anim.cancel(self._col)
-
-        target_color = None
-        duration = 0.2
-
+        if self._col is None:
+            return
         if self.disabled:
-            target_color = (
-                self._original_bg[0] * 0.5,
-                self._original_bg[1] * 0.5,
-                self._original_bg[2] * 0.5,
-                self._original_bg[3] * 0.7
-            )
+            state = "disabled"
         elif self._is_pressed:
-            duration = 0.1
-            target_color = (
-                self._original_bg[0] * 0.7,
-                self._original_bg[1] * 0.7,
-                self._original_bg[2] * 0.7,
-                self._original_bg[3]
-            )
+            state = "pressed"
         elif self._is_hovered:
-            target_color = (
-                min(1.0, self._original_bg[0] * 1.15),
-                min(1.0, self._original_bg[1] * 1.15),
-                min(1.0, self._original_bg[2] * 1.15),
-                self._original_bg[3]
-            )
+            state = "hover"
         else:
-            target_color = self._original_bg
-
-        self._current_anim = Animation(rgba=target_color, duration=duration, transition='out_quad')
-        self._current_anim.start(self._col)
+            state = "normal"
+        self._col.rgba = self._colors[state]
 
     def on_disabled(self, instance, value):
         self._update_color()
@@ -298,13 +462,23 @@ def format_duration(seconds: int) -> str:
         parts.append(f"{minutes}м")
     return " ".join(parts)
 
+def format_duration_short(seconds: int) -> str:
+    hours, rem = divmod(seconds, 3600)
+    minutes, _ = divmod(rem, 60)
+    if hours > 0:
+        return f"{hours}ч {minutes}м"
+    return f"{minutes}м"
+
 def is_same_day(ts1: int, ts2: int) -> bool:
     d1 = datetime.fromtimestamp(ts1)
     d2 = datetime.fromtimestamp(ts2)
     return d1.date() == d2.date()
 
 class TaskCard(BoxLayout):
-    def __init__(self, title, project, description, start_time, end_time, started=False, completed_time=None, task_id=None):
+    """Home screen card; ContentPanel keeps three of them and rebinds them with update()."""
+    STATES = ('active', 'next', 'completed', 'completed_overdue')
+
+    def __init__(self, title='', project='', description='', start_time=0, end_time=0, started=False, completed_time=None, task_id=None):
         super().__init__(orientation='vertical', size_hint_y=None, spacing=dp(10))
         self._radius = [18]
         self._top_h = dp(52)
@@ -318,6 +492,8 @@ class TaskCard(BoxLayout):
         self._task_id = task_id
         self._state = 'active' if self._started else 'next'
         self._completed_time = completed_time
+        self._overdue_time = None
+        self._task = None
 
         with self.canvas.before:
             Color(0, 0, 0, 0.06)
@@ -385,7 +561,7 @@ class TaskCard(BoxLayout):
         def _on_finish(instance):
             from datetime import datetime
             now_ts = int(datetime.now().timestamp())
-            task = taskManager.get_tasks()[self._task_id]
+            task = taskManager.get_task(self._task_id)
             deadline_ts = task.get("end_time")
 
             if deadline_ts is not None and now_ts > deadline_ts:
@@ -409,7 +585,6 @@ class TaskCard(BoxLayout):
                     completed_time=now_ts
                 )
             taskManager.edit_task(self._task_id, state="completed")
-            MDApp.get_running_app().refresh_tasks()
 
         self._check.bind(on_release=_on_finish)
 
@@ -434,13 +609,48 @@ class TaskCard(BoxLayout):
         self._update_state_visuals()
         self._layout()
 
-    def _set_time_text(self):
-            all_tasks = taskManager.get_tasks()
-            self._time.text = self.get_task_time_display(all_tasks[self._task_id])
+    def update(self, task):
+        """Shows another published task record in the same widgets."""
+        if task is self._task:
+            # запись не менялась: пересчитываем только относительное время
+            self._set_time_text()
+            return
+        self._task = task
+        self._task_id = task.get("id")
+        self._title = task.get("title", "Без названия")
+        self._project = task.get("project", "")
+        self._description = task.get("description", "")
+        self._start_time = task.get("start_time", 0)
+        self._end_time = task.get("end_time", 0)
+        self._started = task.get("started", False)
+        self._completed_time = task.get("completed_time")
+        self._overdue_time = (self._completed_time - self._end_time) if (self._completed_time and self._end_time) else None
+        state = task.get("state")
+        self._state = state if state in self.STATES else ('active' if self._started else 'next')
+        self._title_lbl.text = f'[b]{self._title}[/b]'
+        self._proj_lbl.text = self._project
+        self._desc.text = self._description
+        self._update_state_visuals()
+        self._layout()
+
+    def _set_time_text(self, now=None):
+        task = self._task or taskManager.get_task(self._task_id)
+        if task is not None:
+            self._time.text = self.get_task_time_display(task, now)
+
+    def tick(self, now):
+        self._set_time_text(now)
+
+    def on_parent(self, instance, parent):
+        pending = parent is not None and self._state in PENDING_STATES
+        ticker.watch(self, pending)
+        if pending:
+            # пока карточка была снята, минутные тики её пропускали
+            self._set_time_text()
 
     @staticmethod
-    def get_task_time_display(task: dict) -> str:
-        now_ts = int(datetime.now().timestamp())
+    def get_task_time_display(task: dict, now=None) -> str:
+        now_ts = now or int(datetime.now().timestamp())
 
         if task["state"] in ("completed", "completed_overdue"):
             completed_ts = task.get("completed_time")
@@ -532,6 +742,7 @@ class TaskCard(BoxLayout):
         elif self._state == 'completed_overdue':
             self._top._col.rgba = (0.25, 0.75, 0.4, 1)
         self._set_time_text()
+        ticker.watch(self, self.parent is not None and self._state in PENDING_STATES)
 
         if self._state == 'active':
             if self._check.parent is None:
@@ -550,6 +761,8 @@ class TaskCard(BoxLayout):
                     pass
 
 class ContentPanel(BoxLayout):
+    ROLES = ("prev", "center", "next")
+
     def __init__(self):
         super().__init__(orientation='vertical', padding=[0, dp(64), 0, dp(64)])
         with self.canvas.before:
@@ -567,63 +780,13 @@ class ContentPanel(BoxLayout):
         )
         self.container.bind(minimum_height=self.container.setter('height'))
 
-        all_tasks = taskManager.get_tasks() or []
-
-        center_idx = None
-        prev_idx = None
-        next_idx = None
-
-        if all_tasks:
-            for i, t in enumerate(all_tasks):
-                if t.get("state") == "active":
-                    center_idx = i
-                    break
-
-            if center_idx is None:
-                next_indices = [i for i, t in enumerate(all_tasks) if t.get("state") == "next"]
-                if next_indices:
-                    center_idx = next_indices[0]
-                    prev_idx = center_idx - 1 if center_idx - 1 >= 0 else None
-                    next_idx = next_indices[1] if len(next_indices) > 1 else None
-                else:
-                    center_idx = 0
-            else:
-                prev_idx = center_idx - 1 if center_idx - 1 >= 0 else None
-                next_idx = center_idx + 1 if center_idx + 1 < len(all_tasks) else None
-
-        cards_to_add = []
-        if all_tasks:
-            if prev_idx is not None:
-                cards_to_add.append(("prev", all_tasks[prev_idx], prev_idx))
-            cards_to_add.append(("center", all_tasks[center_idx], center_idx))
-            if next_idx is not None:
-                cards_to_add.append(("next", all_tasks[next_idx], next_idx))
-
-        for role, task, idx in cards_to_add:
-            card = TaskCard(
-                title=task.get("title", "Без названия"),
-                project=task.get("project", ""),
-                description=task.get("description", ""),
-                start_time=task.get("start_time", 0),
-                end_time=task.get("end_time", 0),
-                started=task.get("started", False),
-                task_id=idx
-            )
-            state = task.get("state")
-            if state == "completed":
-                card.mark_completed(task.get("completed_time"))
-            elif state == "completed_overdue":
-                completed_time = task.get("completed_time")
-                end_time = task.get("end_time")
-                overdue = (completed_time - end_time) if (completed_time and end_time) else None
-                card.mark_completed_overdue(completed_time, overdue)
-            elif state == "active":
-                card.mark_active()
-            elif state == "next":
-                card.mark_next()
-
+        # карточки создаются один раз, дальше refresh только перепривязывает их к задачам
+        self._cards = {}
+        for role in self.ROLES:
+            card = TaskCard()
             card.bind(height=lambda *a: setattr(self.container, 'height', self.container.minimum_height))
-            self.container.add_widget(card)
+            self._cards[role] = card
+        self.refresh()
 
         self.scroll.add_widget(self.container)
         self.add_widget(self.scroll)
@@ -632,85 +795,66 @@ class ContentPanel(BoxLayout):
         self._bg.pos = self.pos
         self._bg.size = self.size
 
-    def refresh(self):
-        self.container.clear_widgets()
-        all_tasks = taskManager.get_tasks() or []
-
-        center_idx = None
-        prev_idx = None
-        next_idx = None
-
-        if all_tasks:
-            for i, t in enumerate(all_tasks):
-                if t.get("state") == "active":
-                    center_idx = i
-                    break
-
-            if center_idx is None:
-                next_indices = [i for i, t in enumerate(all_tasks) if t.get("state") == "next"]
-                if next_indices:
-                    center_idx = next_indices[0]
-                    prev_idx = center_idx - 1 if center_idx - 1 >= 0 else None
-                    next_idx = next_indices[1] if len(next_indices) > 1 else None
-                else:
-                    center_idx = 0
-            else:
-                prev_idx = center_idx - 1 if center_idx - 1 >= 0 else None
-                next_idx = center_idx + 1 if center_idx + 1 < len(all_tasks) else None
-
-        cards_to_add = []
-        if all_tasks:
-            if prev_idx is not None:
-                cards_to_add.append(("prev", all_tasks[prev_idx], prev_idx))
-            cards_to_add.append(("center", all_tasks[center_idx], center_idx))
-            if next_idx is not None:
-                cards_to_add.append(("next", all_tasks[next_idx], next_idx))
-
-        for role, task, idx in cards_to_add:
-            card = TaskCard(
-                title=task.get("title", "Без названия"),
-                project=task.get("project", ""),
-                description=task.get("description", ""),
-                start_time=task.get("start_time", 0),
-                end_time=task.get("end_time", 0),
-                started=task.get("started", False),
-                task_id=idx
-            )
-            state = task.get("state")
-            if state == "completed":
-                card.mark_completed(task.get("completed_time"))
-            elif state == "completed_overdue":
-                completed_time = task.get("completed_time")
-                end_time = task.get("end_time")
-                overdue = (completed_time - end_time) if (completed_time and end_time) else None
-                card.mark_completed_overdue(completed_time, overdue)
-            elif state == "active":
-                card.mark_active()
-            elif state == "next":
-                card.mark_next()
-
-            card.bind(height=lambda *a: setattr(self.container, 'height', self.container.minimum_height))
-            self.container.add_widget(card)
+    def _select(self):
+        # в центре активная задача, иначе ближайшая по времени начала; соседи — по времени, без обхода списка
+        center = taskManager.active_task()
+        upcoming = taskManager.upcoming(2)
+        if center is None and upcoming:
+            center = upcoming[0]
+        if center is None:
+            all_tasks = taskManager.get_tasks()
+            if not all_tasks:
+                return []
+            center = all_tasks[0]
+        prev_task = taskManager.adjacent_tasks(center.id)[0]
+        next_task = next((t for t in upcoming if t.id != center.id), None)
+        if next_task is None:
+            next_task = taskManager.adjacent_tasks(center.id)[1]
+        if prev_task is not None and next_task is not None and prev_task.id == next_task.id:
+            prev_task = None
+        cards = [("center", center)]
+        if prev_task is not None:
+            cards.insert(0, ("prev", prev_task))
+        if next_task is not None:
+            cards.append(("next", next_task))
+        return cards
 
-class STaskCard(FloatLayout):
-    def __init__(self, title, project, description, start_time, end_time, completed_time=None, started=False, state="", task_id=0):
-        super().__init__(size_hint_y=None)
+    def refresh(self):
+        selected = dict(self._select())
+        shown = []
+        for role in self.ROLES:
+            task = selected.get(role)
+            if task is not None:
+                self._cards[role].update(task)
+                shown.append(self._cards[role])
+        # состав и порядок меняются редко: перекладываем карточки, только если они другие
+        if self.container.children[::-1] != shown:
+            self.container.clear_widgets()
+            for card in shown:
+                self.container.add_widget(card)
+
+class STaskCard(RecycleDataViewBehavior, FloatLayout):
+    """Row of TaskRecycleView: a few instances are created and rebound to tasks in refresh_view_attrs."""
+    COMPACT_H = dp(56)
+
+    def __init__(self, **kw):
+        super().__init__(size_hint_y=None, **kw)
         self._radius = [18]
-        self._compact_h = dp(56)
-        self._title = title
-        self._project = project
-        self._description = description
-        self._start_time = start_time
-        self._end_time = end_time
-        self._started = started
-        self._task_id = task_id
-        if completed_time is not None and end_time is not None:
-            self._overdue_time = completed_time - end_time
-        else:
-            self._overdue_time = None
-        self._completed_time = completed_time
-        self._state = state
+        self._compact_h = self.COMPACT_H
+        self._rv = None
+        self._index = None
+        self._row_height = None
+        self._task_id = None
+        self._title = ''
+        self._project = ''
+        self._description = ''
+        self._start_time = None
+        self._end_time = None
+        self._started = False
+        self._overdue_time = None
         self._completed_time = None
+        self._state = ''
+        self._task = None
         self._expanded = False
 
         self._touch_start_x = 0
@@ -738,7 +882,7 @@ class STaskCard(FloatLayout):
         self.compact_view.bind(pos=lambda w, v: setattr(self.compact_view._r, 'pos', v),
                                size=lambda w, v: setattr(self.compact_view._r, 'size', v))
 
-        self.title_lbl = Label(text=f'[b]{self._title}[/b]', markup=True, color=(1, 1, 1, 1),
+        self.title_lbl = Label(text='', markup=True, color=(1, 1, 1, 1),
                                halign='left', valign='middle')
         self.title_lbl.bind(size=self.title_lbl.setter('text_size'))
         left_anchor = AnchorLayout(anchor_x='left', anchor_y='center')
@@ -755,7 +899,7 @@ class STaskCard(FloatLayout):
         self.expanded_content = BoxLayout(orientation='vertical', size_hint_y=None, height=0, opacity=0)
 
         self.desc_container = BoxLayout(size_hint_y=None, padding=[dp(14), dp(10), dp(14), dp(10)])
-        self._desc = Label(text=self._description, color=(0.12, 0.12, 0.12, 1), halign='left', valign='top',
+        self._desc = Label(text='', color=(0.12, 0.12, 0.12, 1), halign='left', valign='top',
                            size_hint_y=None)
         self._desc.bind(size=self._desc.setter('text_size'))
         self.desc_container.add_widget(self._desc)
@@ -766,9 +910,9 @@ class STaskCard(FloatLayout):
             bot._r = RoundedRectangle(pos=bot.pos, size=bot.size, radius=[0, 0, 18, 18])
         bot.bind(pos=lambda w, v: setattr(bot._r, 'pos', v), size=lambda w, v: setattr(bot._r, 'size', v))
 
-        proj_lbl = Label(text=self._project, color=(0.22, 0.22, 0.22, 1), halign='left', valign='middle')
-        proj_lbl.bind(size=proj_lbl.setter('text_size'))
-        bot.add_widget(proj_lbl)
+        self.proj_lbl = Label(text='', color=(0.22, 0.22, 0.22, 1), halign='left', valign='middle')
+        self.proj_lbl.bind(size=self.proj_lbl.setter('text_size'))
+        bot.add_widget(self.proj_lbl)
 
         self.expanded_content.add_widget(self.desc_container)
         self.expanded_content.add_widget(bot)
@@ -792,11 +936,38 @@ class STaskCard(FloatLayout):
 
         self._swipe_gap = dp(14)
         self._swipe_full = dp(80) - self._swipe_gap
-        Clock.schedule_once(self._post, 0)
         self.bind(size=self._layout, pos=self._layout)
 
+    def refresh_view_attrs(self, rv, index, data):
+        # data: {"task": опубликованная запись, "expanded": bool, "height": высота строки}
+        task = data["task"]
+        if task.id != self._task_id:
+            # виджет достался другой задаче: свайп берём её, он хранится в TaskRecycleView
+            self._restore_swipe(rv.swipe_offset(task.id))
+        self._rv = rv
+        self._index = index
+        self._task = task
+        self._task_id = task.id
+        self._title = task.get("title", "Без названия")
+        self._project = task.get("project", "")
+        self._description = task.get("description", "")
+        self._start_time = task.get("start_time", 0)
+        self._end_time = task.get("end_time", 0)
+        self._started = task.get("started", False)
+        self._completed_time = task.get("completed_time")
+        self._overdue_time = (self._completed_time - self._end_time) if (self._completed_time and self._end_time) else None
+        self._state = task.get("state", "")
+        self._expanded = data.get("expanded", False)
+        self._row_height = data.get("height")
+        self.title_lbl.text = f'[b]{self._title}[/b]'
+        self._desc.text = self._description
+        self.proj_lbl.text = self._project
+        self.expanded_content.opacity = 1 if self._expanded else 0
+        self._update_state_visuals()
+        self._layout()
+
     def _on_edit(self, instance):
-        task = taskManager.get_tasks()[self._task_id]
+        task = taskManager.get_task(self._task_id)
         app = MDApp.get_running_app()
         if app and hasattr(app, 'root_layout'):
             app.root_layout.show_task_editor(task=task, task_id=self._task_id)
@@ -832,29 +1003,14 @@ class STaskCard(FloatLayout):
     def _confirm_delete(self):
         self._delete_dialog.dismiss()
         taskManager.delete_task(self._task_id)
-        app = MDApp.get_running_app()
-        if app and hasattr(app, 'refresh_tasks'):
-            app.refresh_tasks()
         self._animate_swipe_close()
 
-    def _post(self, dt):
-        self._update_state_visuals()
-        self._layout()
-
-    def _set_time_text(self):
-        import time
-        from datetime import datetime
-
-        task = taskManager.get_tasks()[self._task_id]
-
-        def format_duration(seconds: int) -> str:
-            hours, rem = divmod(seconds, 3600)
-            minutes, _ = divmod(rem, 60)
-            if hours > 0:
-                return f"{hours}ч {minutes}м"
-            return f"{minutes}м"
+    def _set_time_text(self, now=None):
+        task = self._task or taskManager.get_task(self._task_id)
+        if task is None:
+            return
 
-        now_ts = int(time.time())
+        now_ts = now or int(time.time())
 
         state = task.get("state")
         start_ts = task.get("start_time")
@@ -867,21 +1023,21 @@ class STaskCard(FloatLayout):
             text = "Завершено " + datetime.fromtimestamp(completed_ts).strftime(
                 "%d.%m %H:%M") if completed_ts else datetime.fromtimestamp(end_ts).strftime("%d.%m %H:%M")
             if state == "completed_overdue" and overdue_sec:
-                text += f"\n+{format_duration(overdue_sec)}"
+                text += f"\n+{format_duration_short(overdue_sec)}"
             self.time_lbl.text = text
             return
 
         if state == "active":
             delta = end_ts - now_ts
-            self.time_lbl.text = "До " + format_duration(delta) if delta > 0 else f"Просрочено на {format_duration(overdue_sec_two)}"
+            self.time_lbl.text = "До " + format_duration_short(delta) if delta > 0 else f"Просрочено на {format_duration_short(overdue_sec_two)}"
             return
 
         if state == "next":
             delta = start_ts - now_ts
             if delta > 0:
-                self.time_lbl.text = format_duration(delta)
+                self.time_lbl.text = format_duration_short(delta)
             elif delta < 0:
-                self.time_lbl.text = f"опоздание {format_duration(-delta)}"
+                self.time_lbl.text = f"опоздание {format_duration_short(-delta)}"
             else:
                 self.time_lbl.text = "Совсем скоро начнётся"
             return
@@ -898,13 +1054,12 @@ class STaskCard(FloatLayout):
         self._desc.height = self._desc.texture_size[1]
         self.desc_container.height = self._desc.height + dp(20)
 
-        if self._expanded:
-            self.expanded_content.height = self.desc_container.height + dp(48)
-            self.main_container.height = self._compact_h + self.expanded_content.height
-        else:
-            self.main_container.height = self._compact_h
-
-        self.height = self.main_container.height
+        self.expanded_content.height = self.desc_container.height + dp(48) if self._expanded else 0
+        self.main_container.height = self._compact_h + self.expanded_content.height
+        if self._rv is not None and abs(self.main_container.height - self._row_height) > 1:
+            # высоту строки задают данные RecycleView: меняем её там, иначе при прокрутке она потеряется
+            rv, index, task_id, expanded, height = self._rv, self._index, self._task_id, self._expanded, self.main_container.height
+            Clock.schedule_once(lambda dt: rv.set_row(index, task_id, expanded, height), 0)
 
         self.main_container.x = self.x + self._swipe_offset
         self.main_container.y = self.y
@@ -925,16 +1080,10 @@ class STaskCard(FloatLayout):
 
     def toggle_expand(self):
         self._expanded = not self._expanded
-
+        self.expanded_content.opacity = 0
         if self._expanded:
-            target_height = self.desc_container.height + dp(48)
-            anim = Animation(height=target_height, opacity=1, duration=0.2)
-            anim.start(self.expanded_content)
-        else:
-            anim = Animation(height=0, opacity=0, duration=0)
-            anim.start(self.expanded_content)
-
-        Clock.schedule_once(lambda dt: self._layout(), 0.21)
+            Animation(opacity=1, duration=0.2).start(self.expanded_content)
+        self._layout()
 
     def set_state(self, state: str):
         if state not in ('active', 'next', 'completed', 'completed_overdue'):
@@ -971,6 +1120,17 @@ class STaskCard(FloatLayout):
             self.compact_view._col.rgba = (0.6, 0.3, 0.4, 1)
 
         self._set_time_text()
+        ticker.watch(self, self.parent is not None and self._state in PENDING_STATES)
+
+    def tick(self, now):
+        self._set_time_text(now)
+
+    def on_parent(self, instance, parent):
+        # вью из кэша RecycleView не на экране: их время не пересчитываем, пока их не вернут в список
+        pending = parent is not None and self._state in PENDING_STATES
+        ticker.watch(self, pending)
+        if pending:
+            self._set_time_text()
 
     def on_touch_down(self, touch):
         if self.collide_point(*touch.pos):
@@ -1042,6 +1202,8 @@ class STaskCard(FloatLayout):
 
     def _on_swipe_closed(self):
         self._swipe_offset = 0
+        if self._rv is not None:
+            self._rv.set_swipe(self._task_id, 0)
         self.edit_btn.opacity = 0
         self.delete_btn.opacity = 0
         self._layout()
@@ -1049,6 +1211,8 @@ class STaskCard(FloatLayout):
 
     def _on_swipe_open(self, final_offset):
         self._swipe_offset = final_offset
+        if self._rv is not None:
+            self._rv.set_swipe(self._task_id, final_offset)
         if final_offset > 0:
             self.edit_btn.opacity = 1
             self.delete_btn.opacity = 0
@@ -1058,6 +1222,13 @@ class STaskCard(FloatLayout):
         self._layout()
         self._is_swiping = False
 
+    def _restore_swipe(self, offset):
+        Animation.cancel_all(self, '_swipe_offset')
+        self._swipe_offset = offset
+        self._is_swiping = False
+        self.edit_btn.opacity = 1 if offset > 0 else 0
+        self.delete_btn.opacity = 1 if offset < 0 else 0
+
     def _animate_swipe_close(self):
         anim = Animation(_swipe_offset=0, duration=0.2)
         anim.bind(on_progress=lambda *a: self._layout())
@@ -1082,6 +1253,83 @@ def add_debug_border(widget, border_color=(1, 0, 0, 1), line_width=2):
 
 
 
+class TaskRecycleView(RecycleView):
+    """Task list that keeps widgets only for the rows on screen.
+
+    Rows are dicts in ``data``; what has to survive recycling (expanded rows and their
+    height, open swipes) is kept here by task id, not in the STaskCard instances. ``show``
+    diffs the new task list against the rows by task id (taskDiff) and only touches rows
+    that changed.
+    """
+
+    def __init__(self, **kw):
+        super().__init__(size_hint=(1, 1), bar_width=dp(4), do_scroll_x=False, **kw)
+        self._expanded = {}
+        self._swipes = {}
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            size_hint=(1, None),
+            default_size=(None, STaskCard.COMPACT_H),
+            default_size_hint=(1, None),
+            spacing=dp(12),
+            padding=[dp(20), dp(18), dp(20), dp(18)]
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # viewclass передаётся layout manager'у, поэтому после add_widget
+        self.viewclass = STaskCard
+
+    def _row(self, task):
+        height = self._expanded.get(task.id)
+        return {"task": task, "expanded": height is not None, "height": height or STaskCard.COMPACT_H}
+
+    def show(self, tasks):
+        # опубликованные записи не меняются, поэтому «задача не изменилась» — это та же самая запись
+        ops = taskDiff.reconcile([row["task"] for row in self.data], tasks, key=lambda t: t.id, same=lambda a, b: a is b)
+        if not ops:
+            return
+        if any(op != "update" for op, _, _ in ops):
+            if self._expanded or self._swipes:
+                live = {t.id for t in tasks}
+                for state in (self._expanded, self._swipes):
+                    for task_id in [i for i in state if i not in live]:
+                        del state[task_id]
+            if len(ops) > len(tasks) // 4 + 16:
+                # почти всё поменялось (первая загрузка, пересортировка): проще заменить данные целиком
+                self.data = [self._row(t) for t in tasks]
+            else:
+                taskDiff.apply(self.data, ops, make=self._row, update=lambda row, task: dict(row, task=task))
+            return
+        # только правки: высоты строк те же, поэтому не трогаем раскладку (любое изменение data
+        # в RecycleView перепривязывает все видимые строки) — пишем строку мимо уведомлений
+        # и перепривязываем только её виджет, если он на экране
+        adapter = self.view_adapter
+        for _, index, task in ops:
+            row = dict(self.data[index], task=task)
+            list.__setitem__(self.data, index, row)
+            view = adapter.views.get(index)
+            if view is not None:
+                adapter.refresh_view_attrs(index, row, view)
+
+    def swipe_offset(self, task_id):
+        return self._swipes.get(task_id, 0)
+
+    def set_swipe(self, task_id, offset):
+        if offset:
+            self._swipes[task_id] = offset
+        else:
+            self._swipes.pop(task_id, None)
+
+    def set_row(self, index, task_id, expanded, height):
+        if expanded:
+            self._expanded[task_id] = height
+        else:
+            self._expanded.pop(task_id, None)
+        # строка могла уехать, пока вызов ждал следующего кадра
+        if index is not None and index < len(self.data) and self.data[index]["task"].id == task_id:
+            self.data[index] = self._row(self.data[index]["task"])
+
+
 class TaskListPanel(BoxLayout):
     def __init__(self):
         super().__init__(orientation='vertical')
@@ -1125,67 +1373,38 @@ class TaskListPanel(BoxLayout):
 
         self._add_btn.bind(on_release=lambda *a: Clock.schedule_once(lambda dt: MDApp.get_running_app().root.show_task_editor_new(), 0))
 
-        self.scroll = ScrollView(size_hint=(1, 1), bar_width=dp(4), do_scroll_x=False)
-        self.container = BoxLayout(
-            orientation='vertical',
-            size_hint_x=1,
-            size_hint_y=None,
-            spacing=dp(12),
-            padding=[dp(20), dp(18), dp(20), dp(18)]
-        )
-        self.container.bind(minimum_height=self.container.setter('height'))
-
-        all_tasks = taskManager.get_tasks() or []
-
-        for task_id, task in enumerate(all_tasks):
-            card = STaskCard(
-                title=task.get("title", "Без названия"),
-                project=task.get("project", ""),
-                description=task.get("description", ""),
-                start_time=task.get("start_time", 0),
-                end_time=task.get("end_time", 0),
-                completed_time=task.get("completed_time", None),
-                started=task.get("started", False),
-                state=task.get("state", ""),
-                task_id=task_id
-            )
-            card.bind(height=lambda *a: setattr(self.container, 'height', self.container.minimum_height))
-            self.container.add_widget(card)
-
-        self.scroll.add_widget(self.container)
-        self.add_widget(self.scroll)
+        self.rv = TaskRecycleView()
+        self.rv.show(taskManager.get_tasks() or [])
+        self.add_widget(self.rv)
 
     def _upd(self, *a):
         self._bg.pos = self.pos
         self._bg.size = self.size
 
     def refresh(self):
-        self.container.clear_widgets()
-
-        all_tasks = taskManager.get_tasks() or []
-
-        for task_id, task in enumerate(all_tasks):
-            card = STaskCard(
-                title=task.get("title", "Без названия"),
-                project=task.get("project", ""),
-                description=task.get("description", ""),
-                start_time=task.get("start_time", 0),
-                end_time=task.get("end_time", 0),
-                completed_time=task.get("completed_time", None),
-                started=task.get("started", False),
-                state=task.get("state", ""),
-                task_id=task_id
-            )
-            card.bind(height=lambda *a: setattr(self.container, 'height', self.container.minimum_height))
-            self.container.add_widget(card)
+        self.rv.show(taskManager.get_tasks() or [])
 
 
+# варианты повтора в редакторе; у еженедельного день недели берётся из даты начала
+REPEAT_OPTIONS = (
+    ("Без повтора", None),
+    ("Каждый день", {"freq": "daily"}),
+    ("Через день", {"freq": "daily", "interval": 2}),
+    ("По будням", {"freq": "weekdays"}),
+    ("Каждую неделю", {"freq": "weekly"}),
+)
+
 class TaskEditorPanel(BoxLayout):
     def __init__(self, root, task=None, task_id=None):
         super().__init__(orientation='vertical')
         self.root = root
         self.task = task or {}
         self.task_id = task_id
+        self.series_id = self.task.get('series_id')
+        series = taskManager.get_task(self.series_id) if self.series_id else None
+        if self.series_id and series is None:
+            self.series_id = None
+        self.recurrence = series.get('recurrence') if series else None
 
         with self.canvas.before:
             Color(0.95, 0.96, 0.98, 1)
@@ -1234,6 +1453,11 @@ class TaskEditorPanel(BoxLayout):
 
         self.start_btn = self._time_btn(content, 'Дата начала', self.start_time, self._pick_start)
         self.end_btn = self._time_btn(content, 'Дедлайн', self.end_time, self._pick_end)
+        # повтор задаётся для новой задачи или меняется у всей серии; обычную задачу серией не сделать
+        self.repeat_btn = None
+        if self.task_id is None or self.series_id is not None:
+            self.repeat_btn = self._time_btn(content, 'Повтор', None, self._next_repeat)
+            self.repeat_btn.text = self._repeat_text()
 
         scroll.add_widget(content)
         self.add_widget(scroll)
@@ -1302,6 +1526,29 @@ class TaskEditorPanel(BoxLayout):
         else:
             self.save_btn.bg = (0.5, 0.5, 0.5, 1)
 
+    def _repeat_text(self):
+        return taskRecurrence.describe(self.recurrence) if self.recurrence else REPEAT_OPTIONS[0][0]
+
+    def _repeat_index(self):
+        # -1 — правило не из списка (задано в настройках или через API)
+        for i, (_, rule) in enumerate(REPEAT_OPTIONS):
+            if rule is None or self.recurrence is None:
+                if rule is self.recurrence:
+                    return i
+            elif rule["freq"] == self.recurrence["freq"] and rule.get("interval", 1) == self.recurrence["interval"]:
+                return i
+        return -1
+
+    def _next_repeat(self, *_):
+        rule = REPEAT_OPTIONS[(self._repeat_index() + 1) % len(REPEAT_OPTIONS)][1]
+        self._set_recurrence(rule)
+
+    def _set_recurrence(self, rule):
+        if rule and rule["freq"] == "weekly":
+            rule = dict(rule, days=[datetime.fromtimestamp(self.start_time or time.time()).weekday()])
+        self.recurrence = rule and taskRecurrence.normalize_rule(rule)
+        self.repeat_btn.text = self._repeat_text()
+
     def _pick_start(self, *_):
         picker = MDDatePicker()
         picker.bind(on_save=self._start_date)
@@ -1315,6 +1562,8 @@ class TaskEditorPanel(BoxLayout):
     def _set_start(self, date, t):
         self.start_time = int(time.mktime(date.timetuple())) + t.hour * 3600 + t.minute * 60
         self.start_btn.text = time.strftime('%d.%m.%Y %H:%M', time.localtime(self.start_time))
+        if self.recurrence and self.recurrence["freq"] == "weekly" and len(self.recurrence["days"]) == 1:
+            self._set_recurrence(self.recurrence)
         self._check_validation()
 
     def _pick_end(self, *_):
@@ -1345,7 +1594,8 @@ class TaskEditorPanel(BoxLayout):
                 start_time=self.start_time,
                 end_time=self.end_time,
                 started=False,
-                state="next"
+                state="next",
+                recurrence=self.recurrence
             )
         else:
             taskManager.edit_task(
@@ -1356,8 +1606,11 @@ class TaskEditorPanel(BoxLayout):
                 start_time=self.start_time,
                 end_time=self.end_time
             )
+            if self.series_id is not None:
+                series = taskManager.get_task(self.series_id)
+                if series is not None and series.get('recurrence') != self.recurrence:
+                    taskManager.set_recurrence(self.series_id, self.recurrence)
 
-        self.root.update_all_task_cards()
         self._close()
 
     def _close(self, *_):
@@ -1532,6 +1785,7 @@ class SettingsPanel(BoxLayout):
     def _on_notif_toggle(self, instance, value):
         self.settings["notifications_enabled"] = value
         save_settings(self.settings)
+        taskManager.reload_notification_settings()
 
     def _close(self, *_):
         anim = Animation(y=-self.height, duration=0.25, transition='in_cubic')
@@ -1625,6 +1879,8 @@ class RootLayout(FloatLayout):
 
     def _show_task_list(self, *args):
         self._task_list_visible = True
+        # пока список был спрятан, минутные тики его пропускали
+        ticker.refresh(self.task_list)
         anim = Animation(y=0, duration=0.3, transition='out_cubic')
         anim.start(self.task_list)
 
@@ -1642,21 +1898,52 @@ class RootLayout(FloatLayout):
 
 class MainApp(MDApp):
     title = 'MAX Time Management'
+    async_manager = False
 
     def build(self):
         self.root_layout = RootLayout()
         return self.root_layout
 
+    # поля, которые не видны на карточках: такие изменения не перерисовывают список
+    SILENT_FIELDS = frozenset(("flags", "missed_time", "last_hour_sent", "fire_times"))
+
     def on_start(self):
-        taskManager.initialize()
-        taskManager.start_manager()
+        # пачка событий за кадр -> одна перерисовка
+        self._refresh_trigger = Clock.create_trigger(lambda dt: self.refresh_tasks())
+        self._unsubscribe = taskManager.subscribe(self._on_task_event)
+        taskManager.initialize(background=True)
+        if not self.async_manager:
+            taskManager.start_manager()
         self.refresh_tasks()
 
+    def _on_task_event(self, event):
+        if event.kind == "updated" and self.SILENT_FIELDS.issuperset(event.fields):
+            return
+        self._refresh_trigger()
+
     def on_stop(self):
+        self._unsubscribe()
         taskManager.stop_manager()
+        taskManager.flush()
         return True
 
     def refresh_tasks(self):
         self.root_layout.update_all_task_cards()
 
-MainApp().run()
\ No newline at end of file
+async def _run_async(app):
+    # планировщик и интерфейс на одном цикле asyncio, без отдельного потока
+    app.async_manager = True
+    manager = asyncio.ensure_future(taskManager.run_manager_async())
+    try:
+        await app.async_run(async_lib="asyncio")
+    finally:
+        taskManager.stop_manager()
+        await manager
+
+
+if __name__ == "__main__":
+    app = MainApp()
+    if get_manager_runtime() == "asyncio":
+        asyncio.run(_run_async(app))
+    else:
+        app.run()
\ No newline at end of file
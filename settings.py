@@ -1,12 +1,25 @@
 import json
 import os
-from kivymd.app import MDApp
+import sys
 
-def get_settings_file():
-    app = MDApp.get_running_app()
+# каталог данных для фоновой службы, которая запускается без интерфейса
+DATA_DIR_ENV = "TASK_MANAGER_DATA_DIR"
+
+def get_running_app():
+    # Kivy не импортируем: если интерфейс запущен, он уже загрузил kivy.app
+    kivy_app = sys.modules.get("kivy.app")
+    return kivy_app.App.get_running_app() if kivy_app else None
+
+def get_data_dir():
+    if os.environ.get(DATA_DIR_ENV):
+        return os.environ[DATA_DIR_ENV]
+    app = get_running_app()
     if app:
-        return os.path.join(app.user_data_dir, "settings.json")
-    return os.path.join(os.path.expanduser("~"), "settings.json")
+        return app.user_data_dir
+    return os.path.expanduser("~")
+
+def get_settings_file():
+    return os.path.join(get_data_dir(), "settings.json")
 
 def load_settings():
     if os.path.exists(get_settings_file()):
@@ -22,4 +35,50 @@ def save_settings(settings):
         json.dump(settings, f, ensure_ascii=False, indent=4)
 
 def is_notifications_enabled():
-    return load_settings().get("notifications_enabled", True)
\ No newline at end of file
+    return load_settings().get("notifications_enabled", True)
+
+def get_storage_backend():
+    return load_settings().get("storage_backend", "journal")
+
+
+def get_write_behind_window():
+    return float(load_settings().get("write_behind_window", 1.0))
+
+
+def get_snapshot_format():
+    return load_settings().get("snapshot_format", "json")
+
+
+def get_archive_settings():
+    # (возраст в днях или None — архив выключен, сжимать ли чанки). По умолчанию выключен:
+    # в интерфейсе истории нет, и выполненные задачи не должны пропадать незаметно
+    settings = load_settings()
+    return settings.get("archive_after_days"), settings.get("archive_compress", True)
+
+
+def get_manager_runtime():
+    # "thread" — свой поток планировщика, "asyncio" — на цикле приложения (App.async_run)
+    return load_settings().get("manager_runtime", "thread")
+
+
+def get_recurrence_lookahead():
+    # за сколько дней вперёд вхождения повторяющихся задач становятся обычными задачами
+    return float(load_settings().get("recurrence_lookahead_days", 2))
+
+
+def get_reminder_rules():
+    # {"default": {...}, "projects": {"Проект": {...}}}, формат правила — taskReminders.DEFAULT_RULE
+    return load_settings().get("reminder_rules", {})
+
+
+def get_notification_settings():
+    # backend: plyer | stdout | memory; rate_limit: [сколько, за сколько секунд] или null; digest_window: секунды, 0 — выкл.
+    settings = load_settings()
+    rate_limit = settings.get("notification_rate_limit", [10, 60])
+    return {
+        "enabled": settings.get("notifications_enabled", True),
+        "backend": settings.get("notification_backend", "plyer"),
+        "queue_size": int(settings.get("notification_queue_size", 100)),
+        "rate_limit": tuple(rate_limit) if rate_limit else None,
+        "digest_window": float(settings.get("notification_digest_window", 0)),
+    }
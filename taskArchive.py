@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+ARCHIVE_STATES = ("completed", "completed_overdue")
+
+
+def month_key(ts):
+    return time.strftime("%Y-%m", time.localtime(int(ts)))
+
+
+class ArchiveStore:
+    """Cold tier for finished tasks: one chunk file per month of ``completed_time``.
+
+    Chunks are ``YYYY-MM.json.gz`` (or plain ``.json`` with ``compress=False``) and are only
+    read when somebody asks for history, never on the startup path. ``ids.json`` keeps the
+    highest archived id, so the live store never hands out an id the archive already has.
+    """
+
+    def __init__(self, directory, compress=True):
+        self.directory = directory
+        self.compress = compress
+        self._lock = threading.Lock()
+
+    def _ids_path(self):
+        return os.path.join(self.directory, "ids.json")
+
+    def max_id(self):
+        """Highest id in the archive (0 if it is empty); a small file read, no chunk is opened."""
+        if not os.path.isdir(self.directory):
+            return 0
+        try:
+            with open(self._ids_path(), "r", encoding="utf-8") as f:
+                return int(json.load(f)["max_id"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # архив старой версии без ids.json: один раз перечитываем чанки
+        with self._lock:
+            max_id = max((t.get("id") or 0 for t in self.iter_tasks()), default=0)
+            self._write_max_id(max_id)
+        return max_id
+
+    def _write_max_id(self, max_id):
+        tmp = self._ids_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"max_id": max_id}, f)
+        os.replace(tmp, self._ids_path())
+
+    def _path(self, month):
+        return os.path.join(self.directory, month + (".json.gz" if self.compress else ".json"))
+
+    def _open(self, path, mode, gz=None):
+        if path.endswith(".gz") if gz is None else gz:
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    def months(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = {n.split(".", 1)[0] for n in os.listdir(self.directory)
+                 if n.endswith((".json", ".json.gz")) and n != "ids.json"}
+        return sorted(names)
+
+    def load_month(self, month):
+        tasks = {}
+        for path in (os.path.join(self.directory, month + ".json"), os.path.join(self.directory, month + ".json.gz")):
+            if os.path.exists(path):
+                try:
+                    with self._open(path, "r") as f:
+                        for t in json.load(f):
+                            tasks[t.get("id")] = t
+                except Exception as e:
+                    print(f"archive read error ({path}):", e)
+        return list(tasks.values())
+
+    def iter_tasks(self, newest_first=True):
+        months = self.months()
+        for month in (reversed(months) if newest_first else months):
+            yield from self.load_month(month)
+
+    def add(self, task_dicts):
+        previous = self.max_id()
+        by_month = {}
+        for t in task_dicts:
+            by_month.setdefault(month_key(t.get("completed_time") or t.get("end_time") or 0), []).append(t)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for month, chunk in by_month.items():
+                merged = {t.get("id"): t for t in self.load_month(month)}
+                merged.update((t.get("id"), t) for t in chunk)
+                path = self._path(month)
+                tmp = path + ".tmp"
+                with self._open(tmp, "w", gz=self.compress) as f:
+                    json.dump(list(merged.values()), f, ensure_ascii=False)
+                os.replace(tmp, path)
+                other = os.path.join(self.directory, month + (".json" if self.compress else ".json.gz"))
+                if os.path.exists(other):
+                    os.remove(other)
+            max_id = max([previous] + [t.get("id") or 0 for t in task_dicts])
+            if max_id > previous:
+                self._write_max_id(max_id)
+        return len(task_dicts)
@@ -0,0 +1,78 @@
+"""Keyed diff of two ordered lists, for updating a list view in place.
+
+``reconcile(old, new, key, same)`` returns an edit script of ``(op, index, item)``
+tuples — ``"remove"``, ``"insert"``, ``"update"`` — that turns ``old`` into ``new`` when
+applied in order (``apply``). Items are matched by ``key``; a matched item whose
+``same(old_item, new_item)`` is false becomes an update. Items that keep their relative
+order (the longest increasing run) stay where they are, the rest are moved as
+remove + insert, so a one-item edit is one update and nothing else is touched.
+"""
+import bisect
+
+
+def _stable(positions):
+    # индексы самой длинной возрастающей подпоследовательности (O(n log n))
+    tails, tail_at, parent = [], [], [None] * len(positions)
+    for i, p in enumerate(positions):
+        j = bisect.bisect_left(tails, p)
+        if j == len(tails):
+            tails.append(p)
+            tail_at.append(i)
+        else:
+            tails[j] = p
+            tail_at[j] = i
+        parent[i] = tail_at[j - 1] if j else None
+    keep = set()
+    i = tail_at[-1] if tail_at else None
+    while i is not None:
+        keep.add(i)
+        i = parent[i]
+    return keep
+
+
+def reconcile(old, new, key=lambda x: x, same=lambda a, b: a == b):
+    ops = []
+    # общие начало и конец сравниваются без построения словарей: обычный случай — правка одной строки
+    start, end_old, end_new = 0, len(old), len(new)
+    while start < end_old and start < end_new and key(old[start]) == key(new[start]):
+        if not same(old[start], new[start]):
+            ops.append(("update", start, new[start]))
+        start += 1
+    tail = []
+    while end_old > start and end_new > start and key(old[end_old - 1]) == key(new[end_new - 1]):
+        end_old -= 1
+        end_new -= 1
+        if not same(old[end_old], new[end_new]):
+            tail.append((end_new, new[end_new]))
+    if start < end_old or start < end_new:
+        new_pos = {key(new[j]): j for j in range(start, end_new)}
+        matched = [i for i in range(start, end_old) if key(old[i]) in new_pos]
+        stable = {matched[k] for k in _stable([new_pos[key(old[i])] for i in matched])}
+        kept = {key(old[i]): old[i] for i in stable}
+        for i in range(end_old - 1, start - 1, -1):
+            if i not in stable:
+                ops.append(("remove", i, None))
+        for j in range(start, end_new):
+            item = new[j]
+            old_item = kept.get(key(item), _MISSING)
+            if old_item is _MISSING:
+                ops.append(("insert", j, item))
+            elif not same(old_item, item):
+                ops.append(("update", j, item))
+    # индексы хвоста уже в координатах нового списка
+    ops.extend(("update", j, item) for j, item in reversed(tail))
+    return ops
+
+
+_MISSING = object()
+
+
+def apply(target, ops, make=lambda item: item, update=lambda current, item: item):
+    """Applies ``ops`` to the mutable sequence ``target``; ``make``/``update`` build the stored values."""
+    for op, index, item in ops:
+        if op == "remove":
+            del target[index]
+        elif op == "insert":
+            target.insert(index, make(item))
+        else:
+            target[index] = update(target[index], item)
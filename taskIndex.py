@@ -0,0 +1,150 @@
+"""Secondary indexes over the live tasks, kept up to date on every mutation.
+
+``TaskIndex`` holds ids only: a set per state, every task except series templates
+sorted by ``start_time`` (neighbours on the home screen), pending ("next") tasks sorted
+by ``start_time`` and unfinished ("next"/"active") tasks sorted by ``end_time``. Sorted
+lists are plain ``[(time, id)]`` kept with ``bisect``, so lookups are O(log n + k).
+taskManager maps the ids back to records of the published snapshot.
+"""
+import bisect
+import threading
+
+from taskRecurrence import SERIES_STATE
+
+PENDING_STATES = ("next", "active")
+
+
+def _as_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _key(task):
+    return task.get("state"), _as_int(task.get("start_time")), _as_int(task.get("end_time"))
+
+
+def _remove(lst, item):
+    i = bisect.bisect_left(lst, item)
+    if i < len(lst) and lst[i] == item:
+        del lst[i]
+
+
+class TaskIndex:
+    def __init__(self):
+        # короткий собственный замок: читатели не ждут _lock планировщика
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._keys = {}
+        self._states = {}
+        self._starts = []
+        self._next_starts = []
+        self._pending_ends = []
+
+    def rebuild(self, tasks):
+        with self._lock:
+            self.clear()
+            self._add_many(tasks)
+
+    def add_many(self, tasks):
+        """Adds tasks that are not indexed yet in one sort instead of one insort each."""
+        with self._lock:
+            self._add_many([t for t in tasks if t.id not in self._keys])
+
+    def _add_many(self, tasks):
+        starts, next_starts, pending_ends = [], [], []
+        for task in tasks:
+            key = _key(task)
+            state, start, end = self._keys[task.id] = key
+            self._states.setdefault(state, set()).add(task.id)
+            if start is not None and state != SERIES_STATE:
+                starts.append((start, task.id))
+                if state == "next":
+                    next_starts.append((start, task.id))
+            if end is not None and state in PENDING_STATES:
+                pending_ends.append((end, task.id))
+        for lst, new in ((self._starts, starts), (self._next_starts, next_starts), (self._pending_ends, pending_ends)):
+            if new:
+                lst.extend(new)
+                lst.sort()
+
+    def update(self, task_id, task):
+        """Re-indexes one task (``task`` None — it was removed); no-op if nothing indexed changed."""
+        key = None if task is None else _key(task)
+        with self._lock:
+            old = self._keys.get(task_id)
+            if old == key:
+                return
+            if old is not None:
+                self._unlink(task_id, old)
+            if key is None:
+                return
+            self._keys[task_id] = key
+            state, start, end = key
+            self._states.setdefault(state, set()).add(task_id)
+            if start is not None and state != SERIES_STATE:
+                bisect.insort(self._starts, (start, task_id))
+                if state == "next":
+                    bisect.insort(self._next_starts, (start, task_id))
+            if end is not None and state in PENDING_STATES:
+                bisect.insort(self._pending_ends, (end, task_id))
+
+    def _unlink(self, task_id, key):
+        del self._keys[task_id]
+        state, start, end = key
+        self._states[state].discard(task_id)
+        if start is not None and state != SERIES_STATE:
+            _remove(self._starts, (start, task_id))
+            if state == "next":
+                _remove(self._next_starts, (start, task_id))
+        if end is not None and state in PENDING_STATES:
+            _remove(self._pending_ends, (end, task_id))
+
+    def in_state(self, state):
+        with self._lock:
+            return set(self._states.get(state, ()))
+
+    def count(self, state):
+        with self._lock:
+            return len(self._states.get(state, ()))
+
+    def first_in_state(self, state):
+        """Id of the earliest-starting task in ``state``, or None."""
+        with self._lock:
+            ids = self._states.get(state)
+            if not ids:
+                return None
+            return min(ids, key=lambda i: (self._keys[i][1] is None, self._keys[i][1] or 0, i))
+
+    def upcoming(self, n, after=None):
+        """Ids of the first ``n`` "next" tasks by start time (starting at or after ``after`` if given)."""
+        with self._lock:
+            i = 0 if after is None else bisect.bisect_left(self._next_starts, (after,))
+            return [task_id for _, task_id in self._next_starts[i:i + n]]
+
+    def overdue(self, now):
+        """Ids of unfinished tasks whose end time is before ``now``, oldest deadline first."""
+        with self._lock:
+            i = bisect.bisect_left(self._pending_ends, (now,))
+            return [task_id for _, task_id in self._pending_ends[:i]]
+
+    def due_between(self, a, b):
+        """Ids of unfinished tasks with the end time in [a, b), by end time."""
+        with self._lock:
+            lo = bisect.bisect_left(self._pending_ends, (a,))
+            hi = bisect.bisect_left(self._pending_ends, (b,))
+            return [task_id for _, task_id in self._pending_ends[lo:hi]]
+
+    def neighbours(self, task_id):
+        """Ids of the tasks just before and just after ``task_id`` by start time (None at the edges)."""
+        with self._lock:
+            key = self._keys.get(task_id)
+            if key is None or key[1] is None or key[0] == SERIES_STATE:
+                return None, None
+            i = bisect.bisect_left(self._starts, (key[1], task_id))
+            prev_id = self._starts[i - 1][1] if i > 0 else None
+            next_id = self._starts[i + 1][1] if i + 1 < len(self._starts) else None
+            return prev_id, next_id
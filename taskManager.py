@@ -1,97 +1,576 @@
-import json
+import asyncio
 import os
-import time
+import signal
+import sys
 import threading
-from pathlib import Path
+from collections import namedtuple
+from itertools import chain
 
-from kivy.clock import Clock
-from kivy.app import App
-from kivymd.app import MDApp
-
-from settings import is_notifications_enabled, load_settings, save_settings, get_settings_file
+from settings import get_storage_backend, get_write_behind_window, get_snapshot_format, get_archive_settings, \
+    get_reminder_rules, get_notification_settings, get_data_dir, get_manager_runtime, get_recurrence_lookahead, \
+    DATA_DIR_ENV
+from taskArchive import ArchiveStore, ARCHIVE_STATES
+from taskIndex import TaskIndex
+from taskModel import TaskRecord
+from taskNotify import NotificationDispatcher, make_backend
+from taskRecurrence import SERIES_STATE, normalize_rule, occurrences
+from taskReminders import LEGACY_FLAGS, compile_schedule, describe, repeat_base, resolve_rule
+from taskScheduler import TimingWheel, WallClock
+from taskStorage import JournalStore, SqliteStore, WriteBehind
 
 
 def get_tasks_file():
-    app = MDApp.get_running_app()
-    if app:
-        return os.path.join(app.user_data_dir, "tasks.json")
-    return os.path.join(os.path.expanduser("~"), "tasks.json")
+    return os.path.join(get_data_dir(), "tasks.json")
+
+def get_tasks_db():
+    return os.path.splitext(get_tasks_file())[0] + ".db"
+
+def get_archive_dir():
+    return os.path.join(os.path.dirname(get_tasks_file()), "archive")
+
+# id -> задача, порядок вставки сохраняется; менять только под _lock
+tasks = {}
+_next_id = 1
+
+# снимок делится по id на чанки по _CHUNK_SIZE задач; новая публикация пересобирает только изменённые
+_CHUNK_SIZE = 1024
+
+class _Snapshot:
+    """Tasks as readers see them; chunks not touched since the previous snapshot are shared with it."""
+
+    def __init__(self, chunks):
+        # номер чанка -> (id -> задача, кортеж задач для списков)
+        self.chunks = chunks
+        self._rows = None
+
+    def get(self, task_id):
+        chunk = self.chunks.get(task_id // _CHUNK_SIZE) if isinstance(task_id, int) else None
+        return None if chunk is None else chunk[0].get(task_id)
+
+    def rows(self):
+        # общий кортеж собирается при первом чтении, а не при каждой публикации
+        if self._rows is None:
+            self._rows = tuple(chain.from_iterable(self.chunks[key][1] for key in sorted(self.chunks)))
+        return self._rows
 
-tasks = []
+def _chunk(by_id):
+    # шаблоны повторяющихся задач в списки не попадают, но доступны через get_task
+    return by_id, tuple(t for t in by_id.values() if t.state != SERIES_STATE)
 
+# снимок для читателей (UI). Записи в опубликованном снимке больше никогда не меняются —
+# писатель сначала копирует задачу (_writable); _changed — id, изменённые после публикации
+_published = _Snapshot({})
+_private = set()
+_changed = set()
+_publish_all = False
+
+# события изменений: kind — одно из EVENT_KINDS, fields — изменённые поля
+TaskEvent = namedtuple("TaskEvent", "kind task_id fields")
+EVENT_KINDS = ("added", "updated", "removed", "state_changed", "reset")
+_subscribers = []
+_pending_events = []
+_delivery_scheduled = False
+_events_lock = threading.Lock()
+
+# таймеры напоминаний: ключ (id задачи, вид из TIMER_KINDS)
+_clock = WallClock()
+_timers = TimingWheel(int(_clock.time()))
+# счётчики планировщика: проходы, проверенные задачи, уведомления, записи в журнал, опоздание (сек)
+_stats = {"passes": 0, "checked": 0, "fired": 0, "writes": 0, "late_total": 0, "late_max": 0}
+_active_ids = set()
+_gated = set()
+# вторичные индексы (состояние, время начала и конца) — обновляются в _reschedule
+_index = TaskIndex()
+
+_store = None
+_archive = None
+_lock = threading.RLock()
 _initialized = False
+_loading = False
 
-def initialize():
+def initialize(background=False, on_progress=None):
     global _initialized
     if not _initialized:
-        load_tasks()
+        if background:
+            _load_tasks_streaming(on_progress)
+        else:
+            load_tasks()
         _initialized = True
     print(f"Tasks file location: {get_tasks_file()}")
 
 
+def _get_store():
+    global _store
+    if _store is None or _store.snapshot_path != get_tasks_file():
+        if _store is not None:
+            _store.close()
+        if get_storage_backend() == "sqlite":
+            # при первом запуске содержимое tasks.json переносится в базу
+            backend = SqliteStore(get_tasks_db(), json_path=get_tasks_file())
+        else:
+            backend = JournalStore(get_tasks_file(), snapshot_format=get_snapshot_format())
+        _store = WriteBehind(backend, window=get_write_behind_window(), snapshot=lambda: None if _loading else tasks,
+                             mutation_lock=_lock)
+    return _store
+
+def _publish():
+    global _published, _publish_all, _delivery_scheduled
+    if _publish_all:
+        grouped = {}
+        for task_id in sorted(tasks):
+            grouped.setdefault(task_id // _CHUNK_SIZE, {})[task_id] = tasks[task_id]
+        chunks = {key: _chunk(by_id) for key, by_id in grouped.items()}
+        _publish_all = False
+    else:
+        chunks = dict(_published.chunks)
+        for key in {task_id // _CHUNK_SIZE for task_id in _changed}:
+            old = chunks.pop(key, ({}, ()))[0]
+            ids = sorted(old.keys() | {i for i in _changed if i // _CHUNK_SIZE == key})
+            by_id = {i: tasks[i] for i in ids if i in tasks}
+            if by_id:
+                chunks[key] = _chunk(by_id)
+    _published = _Snapshot(chunks)
+    _private.clear()
+    _changed.clear()
+    with _events_lock:
+        schedule = bool(_pending_events) and not _delivery_scheduled
+        if schedule:
+            _delivery_scheduled = True
+    if schedule:
+        # все события до следующего кадра уходят одной пачкой, уже после публикации снимка
+        _call_on_main(_deliver_events)
+
+def subscribe(callback):
+    """callback(event) is called on the Kivy main thread (right away when running headless); returns a function that unsubscribes."""
+    _subscribers.append(callback)
+    return lambda: unsubscribe(callback)
+
+def unsubscribe(callback):
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+def _call_on_main(fn):
+    # модуль не тянет Kivy сам: без интерфейса (serve) события доставляются сразу
+    kivy_clock = sys.modules.get("kivy.clock")
+    if kivy_clock is None:
+        fn()
+    else:
+        kivy_clock.Clock.schedule_once(lambda dt: fn(), 0)
+
+def _emit(kind, task_id=None, fields=None):
+    # вызывается под _lock перед _publish(), доставка — после публикации
+    if not _subscribers:
+        return
+    with _events_lock:
+        _pending_events.append(TaskEvent(kind, task_id, fields or {}))
+
+def _emit_edit(task_id, previous_state, fields):
+    _emit("updated", task_id, fields)
+    if "state" in fields and fields["state"] != previous_state:
+        _emit("state_changed", task_id, {"state": fields["state"], "previous_state": previous_state})
+
+def _deliver_events():
+    global _delivery_scheduled
+    with _events_lock:
+        events = _pending_events[:]
+        _pending_events.clear()
+        _delivery_scheduled = False
+    for event in events:
+        for callback in list(_subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print("task event handler error:", e)
+
+def _writable(task_id):
+    task = tasks[task_id]
+    if task_id not in _private:
+        task = task.copy()
+        tasks[task_id] = task
+        _private.add(task_id)
+        _changed.add(task_id)
+    return task
+
 def load_tasks():
-    global tasks
-    if os.path.exists(get_tasks_file()):
+    global tasks, _next_id
+    with _lock:
         try:
-            with open(get_tasks_file(), "r", encoding="utf-8") as f:
-                tasks = json.load(f)
+            tasks = _get_store().load()
         except Exception:
-            tasks = []
-    else:
-        tasks = []
-
-def save_tasks():
-    with open(get_tasks_file(), "w", encoding="utf-8") as f:
-        json.dump(tasks, f, ensure_ascii=False, indent=4)
-
-def add_task(title, project, description, start_time, end_time, started=False, state='next'):
-    task = {
-        "title": title,
-        "project": project,
-        "description": description,
-        "start_time": start_time,
-        "end_time": end_time,
-        "started": started,
-        "state": state,
-        "created": int(time.time())
-    }
-    tasks.append(task)
-    save_tasks()
+            tasks = {}
+        _next_id = _first_free_id()
+        _private.clear()
+        _reschedule_all()
+        _emit("reset")
+        _publish()
+
+def _load_tasks_streaming(on_progress=None):
+    # сначала активные и ближайшие задачи (для главного экрана), остальное догружается в фоне
+    global tasks, _next_id, _loading
+    store = _get_store()
+    if not hasattr(store, "stream"):
+        load_tasks()
+        if on_progress:
+            on_progress(1, 1, True)
+        return
+    try:
+        events = store.stream()
+        _, hot, _ = next(events)
+    except Exception as e:
+        print("streaming load error:", e)
+        load_tasks()
+        if on_progress:
+            on_progress(1, 1, True)
+        return
+    with _lock:
+        tasks = {t.id: t for t in hot}
+        _next_id = _first_free_id()
+        _loading = True
+        _private.clear()
+        _reschedule_all()
+        _emit("reset")
+        _publish()
+
+    def _rest():
+        global _loading
+        done, total = 0, 0
+        try:
+            for _, batch, done, total in events:
+                with _lock:
+                    added = [t for t in batch if tasks.setdefault(t.id, t) is t]
+                    _index.add_many(added)
+                    for t in added:
+                        _reschedule(t.id, wake=False)
+                    _publish()
+                if on_progress:
+                    on_progress(done, total, False)
+        except Exception as e:
+            print("streaming load error:", e)
+        with _lock:
+            ordered = sorted(tasks.items())
+            tasks.clear()
+            tasks.update(ordered)
+            _loading = False
+            _reschedule_all()
+            _emit("reset")
+            _publish()
+        if on_progress:
+            on_progress(done, total, True)
+
+    threading.Thread(target=_rest, daemon=True).start()
+
+def _first_free_id():
+    # id не выдаются повторно: ни после удаления, ни после переноса задачи в архив
+    return max(max(tasks, default=0), getattr(_get_store(), "max_id", 0), _get_archive().max_id()) + 1
+
+def is_loading():
+    return _loading
+
+def save_tasks(background=False):
+    # полный снимок: журнал сворачивается в tasks.json
+    if _loading:
+        return
+    _get_store().compact(tasks, background=background)
+
+def flush():
+    if _store is not None:
+        _store.wait()
+
+def _journal(record):
+    _stats["writes"] += 1
+    try:
+        # запись только ставится в очередь; когда журнал пора свернуть, решает поток WriteBehind
+        _get_store().append(record)
+    except Exception as e:
+        print("journal write error:", e)
+
+def _journal_edit(task_id, **fields):
+    _journal({"op": "edit", "id": task_id, "fields": fields})
+
+def add_task(title, project, description, start_time, end_time, started=False, state='next', reminders=None, recurrence=None):
+    """Adds a task; with ``recurrence`` (see taskRecurrence) adds a series and returns its template."""
+    task = TaskRecord(
+        title=title,
+        project=project,
+        description=description,
+        start_time=start_time,
+        end_time=end_time,
+        started=started,
+        state=state,
+        created=_now(),
+        reminders=reminders
+    )
+    if recurrence is not None:
+        task.state = SERIES_STATE
+        task["recurrence"] = normalize_rule(recurrence)
+    _compile_reminders(task)
+    with _lock:
+        _insert(task)
+        if recurrence is not None:
+            _materialize(task.id, _now())
+        _publish()
     return task
 
-def delete_task(task_index):
-    if 0 <= task_index < len(tasks):
-        tasks.pop(task_index)
-        save_tasks()
+def _insert(task):
+    # под _lock; _publish() — за вызывающим
+    global _next_id
+    task.id = _next_id
+    _next_id += 1
+    tasks[task.id] = task
+    _journal({"op": "add", "task": task.to_dict()})
+    _reschedule(task.id)
+    _emit("added", task.id)
+
+def delete_task(task_id):
+    with _lock:
+        if tasks.pop(task_id, None) is not None:
+            _journal({"op": "delete", "id": task_id})
+            _reschedule(task_id)
+            _emit("removed", task_id)
+            _publish()
 
-def edit_task(task_index, title=None, project=None, description=None, start_time=None, end_time=None, started=None, state=None, completed_time=None):
-    if 0 <= task_index < len(tasks):
-        task = tasks[task_index]
+def edit_task(task_id, title=None, project=None, description=None, start_time=None, end_time=None, started=None, state=None, completed_time=None, reminders=None):
+    if task_id in tasks:
+        fields = {}
         if title is not None:
-            task["title"] = title
+            fields["title"] = title
         if project is not None:
-            task["project"] = project
+            fields["project"] = project
         if description is not None:
-            task["description"] = description
+            fields["description"] = description
         if start_time is not None:
-            task["start_time"] = start_time
+            fields["start_time"] = start_time
         if end_time is not None:
-            task["end_time"] = end_time
+            fields["end_time"] = end_time
         if completed_time is not None:
-            task["completed_time"] = completed_time
+            fields["completed_time"] = completed_time
         if started is not None:
-            task["started"] = started
+            fields["started"] = started
         if state is not None:
-            task["state"] = state
-        save_tasks()
+            fields["state"] = state
+        if reminders is not None:
+            fields["reminders"] = reminders
+        if fields:
+            with _lock:
+                if task_id in tasks:
+                    task = _writable(task_id)
+                    previous_state = task.get("state")
+                    task.update(fields)
+                    if _SCHEDULE_FIELDS.intersection(fields):
+                        _compile_reminders(task)
+                        fields["fire_times"] = task.get("fire_times")
+                    _journal_edit(task_id, **fields)
+                    _reschedule(task_id)
+                    _emit_edit(task_id, previous_state, fields)
+                    _publish()
+
+def set_recurrence(series_id, rule):
+    """Changes the rule of a series for the occurrences not created yet; None stops the series."""
+    with _lock:
+        series = tasks.get(series_id)
+        if series is None or series.get("state") != SERIES_STATE:
+            return
+        if rule is None:
+            _delete_series(series_id)
+        else:
+            series = _writable(series_id)
+            series["recurrence"] = normalize_rule(rule)
+            _journal_edit(series_id, recurrence=series["recurrence"])
+            _emit("updated", series_id, {"recurrence": series["recurrence"]})
+            _materialize(series_id, _now())
+        _publish()
+
+def _delete_series(series_id):
+    # уже созданные вхождения остаются обычными задачами
+    del tasks[series_id]
+    _journal({"op": "delete", "id": series_id})
+    _reschedule(series_id, wake=False)
+    _emit("removed", series_id)
+
+def materialize_series(now=None):
+    """Creates the occurrences of every series that start within the lookahead window; returns how many."""
+    now = _now() if now is None else now
+    created = 0
+    with _lock:
+        for series_id in _index.in_state(SERIES_STATE):
+            created += _materialize(series_id, now)
+        if created:
+            _publish()
+    return created
+
+def _materialize(series_id, now):
+    series = tasks[series_id]
+    start_time, end_time = _as_int(series.get("start_time")), _as_int(series.get("end_time"))
+    if start_time is None or end_time is None:
+        return 0
+    duration = end_time - start_time
+    horizon = now + int(get_recurrence_lookahead() * 86400)
+    last = series.get("materialized_until")
+    # вхождения, закончившиеся, пока приложение не работало, задним числом не создаются
+    after = now - duration if last is None else max(last, now - duration)
+    made = 0
+    for ts in occurrences(series["recurrence"], start_time, after):
+        # первое вхождение создаётся сразу, даже за горизонтом, — чтобы задача была видна
+        if ts > horizon and (made or last is not None):
+            break
+        task = TaskRecord(title=series.get("title"), project=series.get("project"),
+                          description=series.get("description"), start_time=ts, end_time=ts + duration,
+                          started=False, state="next", created=now, reminders=series.get("reminders"),
+                          series_id=series_id)
+        _compile_reminders(task, now)
+        _insert(task)
+        last = ts
+        made += 1
+    else:
+        # count/until исчерпаны: шаблон больше не нужен
+        _delete_series(series_id)
+        return made
+    if made:
+        series = _writable(series_id)
+        series["materialized_until"] = last
+        _journal_edit(series_id, materialized_until=last)
+    return made
+
+# поля, от которых зависит расписание напоминаний
+_SCHEDULE_FIELDS = frozenset(("project", "start_time", "end_time", "state", "reminders"))
+_reminder_rules = None
+
+def _rule_for(task):
+    global _reminder_rules
+    if _reminder_rules is None:
+        _reminder_rules = get_reminder_rules()
+    return resolve_rule(_reminder_rules, task.get("project"), task.get("reminders"))
+
+def _compile_reminders(task, now=None):
+    # правила разворачиваются в абсолютные времена один раз, при сохранении задачи
+    if task.get("state") in _INERT_STATES:
+        task["fire_times"] = None
+    else:
+        task["fire_times"] = compile_schedule(task, _rule_for(task), _now() if now is None else now)
+
+def recompile_reminders():
+    """Re-reads the reminder rules from settings and recompiles every pending task's schedule."""
+    global _reminder_rules
+    _reminder_rules = get_reminder_rules()
+    with _lock:
+        for task_id in list(tasks):
+            if tasks[task_id].get("state") in _INERT_STATES:
+                continue
+            task = _writable(task_id)
+            _compile_reminders(task)
+            _journal_edit(task_id, fire_times=task.get("fire_times"))
+            _reschedule(task_id, wake=False)
+        _wake_scheduler()
+        _publish()
+
+# читатели не берут _lock и никогда не ждут планировщик: они получают последний опубликованный снимок
+
+def get_task(task_id):
+    return _published.get(task_id)
 
 def get_tasks():
-    return tasks
+    return _published.rows()
+
+# запросы по индексам: id берутся из _index, записи — из опубликованного снимка; индекс может
+# на мгновение опередить снимок, поэтому состояние записи перепроверяется
+
+def _published_in(ids, states):
+    found = [_published.get(i) for i in ids]
+    return [t for t in found if t is not None and t.get("state") in states]
+
+def active_task():
+    """The active task (the earliest-starting one if there are several), or None."""
+    found = _published_in([_index.first_in_state("active")], ("active",))
+    return found[0] if found else None
+
+def upcoming(n=1):
+    """The first ``n`` tasks still in the "next" state, soonest ``start_time`` first."""
+    return _published_in(_index.upcoming(n), ("next",))
+
+def next_due_task(now=None):
+    """The soonest "next" task that starts at or after ``now``."""
+    found = _published_in(_index.upcoming(1, after=_now() if now is None else now), ("next",))
+    return found[0] if found else None
+
+def overdue(now=None):
+    """Unfinished tasks past their end time, oldest deadline first."""
+    return _published_in(_index.overdue(_now() if now is None else now), ("next", "active"))
+
+def due_between(a, b):
+    """Unfinished tasks with the end time in [a, b), by end time."""
+    return _published_in(_index.due_between(a, b), ("next", "active"))
 
-RUN_LOOP_INTERVAL = 20
+def adjacent_tasks(task_id):
+    """(previous, next) task by start time around ``task_id``; None at the edges."""
+    return tuple(_published.get(i) for i in _index.neighbours(task_id))
+
+def _get_archive():
+    global _archive
+    compress = get_archive_settings()[1]
+    if _archive is None or _archive.directory != get_archive_dir() or _archive.compress != compress:
+        _archive = ArchiveStore(get_archive_dir(), compress=compress)
+    return _archive
+
+def archive_completed(now=None):
+    """Moves tasks finished more than archive_after_days ago from the live store to the archive (off unless set)."""
+    if _loading:
+        return 0
+    max_age_days = get_archive_settings()[0]
+    if max_age_days is None:
+        return 0
+    cutoff = (_now() if now is None else now) - int(max_age_days * 86400)
+    with _lock:
+        old = [t.to_dict() for t in tasks.values()
+               if t.get("state") in ARCHIVE_STATES and (_as_int(t.get("completed_time")) or cutoff) < cutoff]
+    if not old:
+        return 0
+    # сначала архив, потом удаление из живого хранилища: при падении задача окажется в обоих местах, но не потеряется
+    _get_archive().add(old)
+    moved = 0
+    with _lock:
+        for t in old:
+            task = tasks.get(t["id"])
+            if task is not None and task.get("state") in ARCHIVE_STATES:
+                del tasks[t["id"]]
+                _journal({"op": "delete", "id": t["id"]})
+                _reschedule(t["id"])
+                _emit("removed", t["id"])
+                moved += 1
+        if moved:
+            _publish()
+    return moved
+
+def get_archived_tasks(month=None):
+    """History of archived tasks; reads archive chunks from disk on every call."""
+    archive = _get_archive()
+    if month is not None:
+        return [TaskRecord.from_dict(t) for t in archive.load_month(month)]
+    return [TaskRecord.from_dict(t) for t in archive.iter_tasks()]
+
+def get_archive_months():
+    return _get_archive().months()
+
+ARCHIVE_INTERVAL = 3600
 
 def _now():
-    return int(time.time())
+    return int(_clock.time())
+
+def set_clock(clock):
+    """Swaps the time source (e.g. taskScheduler.VirtualClock) and re-arms every timer against it."""
+    global _clock, _timers
+    with _lock:
+        _clock = clock
+        _timers = TimingWheel(_now())
+        _reschedule_all()
+
+def scheduler_stats():
+    return dict(_stats)
+
+def _record_fire(due_time, now):
+    late = max(now - due_time, 0)
+    _stats["fired"] += 1
+    _stats["late_total"] += late
+    _stats["late_max"] = max(_stats["late_max"], late)
 
 def _as_int(v):
     try:
@@ -120,130 +599,429 @@ def _format_duration(seconds):
         parts.append(f"{minutes}m")
     return " ".join(parts)
 
-try:
-    from plyer import notification as _plyer_notification
+_dispatcher = None
 
-    def _notify(title, message):
-        # Проверяем, включены ли уведомления
-        if not is_notifications_enabled():
-            return
+def _get_dispatcher():
+    # настройки уведомлений читаются один раз; после их изменения — reload_notification_settings()
+    global _dispatcher
+    if _dispatcher is None:
+        cfg = get_notification_settings()
+        _dispatcher = NotificationDispatcher(make_backend(cfg["backend"]), queue_size=cfg["queue_size"],
+                                             rate_limit=cfg["rate_limit"], digest_window=cfg["digest_window"],
+                                             enabled=cfg["enabled"])
+    return _dispatcher
 
-        try:
-            _plyer_notification.notify(title=title, message=message)
-        except Exception:
-            print(f"[NOTIFY] {title} — {message}")
-except Exception:
-    def _notify(title, message):
-        print(f"[NOTIFY] {title} — {message}")
+def reload_notification_settings():
+    global _dispatcher
+    old, _dispatcher = _dispatcher, None
+    if old is not None:
+        # старый диспетчер дорабатывает очередь в фоне, интерфейс не ждёт
+        threading.Thread(target=old.close, daemon=True).start()
+
+def notification_stats():
+    return _get_dispatcher().stats()
+
+def _close_dispatcher():
+    global _dispatcher
+    old, _dispatcher = _dispatcher, None
+    if old is not None:
+        old.close()
+
+def _notify(title, message):
+    # только ставит в очередь: медленный или сломанный бэкенд не задерживает планировщик
+    _get_dispatcher().submit(title, message)
 
 def _send_task_notification(task, subject, body=None):
     title = f"Task: {task.get('title','(no title)')} — {subject}"
     message = body or ""
     _notify(title, message)
 
+CATCH_UP_GAP = 5 * 60
+
 _running = False
 _thread = None
+_wake = threading.Event()
+_expected_wake = None
+_last_archive = 0
+_last_catch_up = None
+
+# asyncio-вариант: планировщик живёт на цикле приложения (App.async_run), без своего потока
+_async_loop = None
+_async_timer = None
+_async_stop = None
+_async_wake_pending = False
 
 def start_manager():
-    global _running, _thread
+    global _running, _thread, _expected_wake, _last_archive
     if _running:
         return
     _running = True
+    _expected_wake = None
+    _last_archive = 0
     _thread = threading.Thread(target=_manager_loop, daemon=True)
     _thread.start()
 
 def stop_manager():
     global _running, _thread
     _running = False
+    _wake.set()
     if _thread:
         _thread.join(timeout=1)
         _thread = None
+    loop, stop = _async_loop, _async_stop
+    if loop is not None and stop is not None:
+        loop.call_soon_threadsafe(lambda: stop.done() or stop.set_result(None))
+    flush()
+    _close_dispatcher()
+
+def _manager_step():
+    """One scheduler pass; returns how many seconds to sleep before the next one."""
+    global _expected_wake, _last_archive
+    next_time = None
+    try:
+        next_time = _run_due()
+        if _now() - _last_archive >= ARCHIVE_INTERVAL and not _loading:
+            _last_archive = _now()
+            _off_loop(_maintenance)
+    except Exception as e:
+        print("manager loop error:", e)
+    now = _clock.time()
+    timeout = max(_last_archive + ARCHIVE_INTERVAL - now, 1)
+    if next_time is not None:
+        timeout = min(timeout, max(next_time - now, 0))
+    _expected_wake = now + timeout
+    return timeout
+
+def _maintenance():
+    archive_completed()
+    materialize_series()
+
+def _off_loop(fn):
+    # на цикле asyncio работает интерфейс: gzip архива и ожидание диска уходят в пул потоков
+    loop = _async_loop
+    if loop is None:
+        fn()
+    else:
+        loop.run_in_executor(None, _guarded, fn)
+
+def _guarded(fn):
+    try:
+        fn()
+    except Exception as e:
+        print("manager loop error:", e)
 
 def _manager_loop():
+    # спим ровно до ближайшего дедлайна; любое изменение задач будит поток через _wake
     while _running:
-        try:
-            _check_all_tasks()
-        except Exception as e:
-            print("manager loop error:", e)
-        time.sleep(RUN_LOOP_INTERVAL)
+        _wake.clear()
+        _wake.wait(_manager_step())
+
+async def run_manager_async():
+    """Runs the scheduler on the current asyncio loop until stop_manager() or cancellation.
+
+    Deadlines are ``loop.call_at`` timers; meant to be gathered with ``App.async_run``.
+    """
+    global _running, _async_loop, _async_stop, _async_timer, _expected_wake, _last_archive
+    if _running:
+        return
+    loop = asyncio.get_running_loop()
+    _async_loop = loop
+    _async_stop = loop.create_future()
+    _running = True
+    _expected_wake = None
+    _last_archive = 0
+    loop.call_soon(_async_tick)
+    try:
+        await _async_stop
+    finally:
+        _running = False
+        if _async_timer is not None:
+            _async_timer.cancel()
+            _async_timer = None
+        _async_loop = None
+        _async_stop = None
+        await loop.run_in_executor(None, flush)
+        _close_dispatcher()
+
+def _async_tick():
+    global _async_timer, _async_wake_pending
+    _async_wake_pending = False
+    if _async_timer is not None:
+        _async_timer.cancel()
+        _async_timer = None
+    if not _running or _async_loop is None:
+        return
+    timeout = _manager_step()
+    _async_timer = _async_loop.call_at(_async_loop.time() + timeout, _async_tick)
+
+def _wake_scheduler():
+    global _async_wake_pending
+    _wake.set()
+    loop = _async_loop
+    if loop is not None and not _async_wake_pending:
+        _async_wake_pending = True
+        loop.call_soon_threadsafe(_async_tick)
+
+TIMER_KINDS = ("reminder", "start", "repeat")
+# задачи в этих состояниях таймеров не получают
+_INERT_STATES = ARCHIVE_STATES + (SERIES_STATE,)
+
+def _task_timers(task):
+    """(kind, time) of every timer ``task`` needs: next compiled reminder, start, next repeat."""
+    state = task.get("state")
+    if state in _INERT_STATES:
+        return
+    fire_times = task.get("fire_times")
+    if fire_times:
+        yield "reminder", fire_times[0][0]
+    start_time = _as_int(task.get("start_time"))
+    if state == "next" and start_time is not None:
+        yield "start", start_time
+    repeat = repeat_base(_rule_for(task), _as_int(task.get("end_time")))
+    if repeat is not None:
+        # повторяющееся напоминание о просрочке: после срабатывания ставится заново
+        yield "repeat", repeat[0] + task.last_hour_sent * repeat[1]
+
+def _register_timers(task_id):
+    for kind in TIMER_KINDS:
+        _timers.cancel((task_id, kind))
+    task = tasks.get(task_id)
+    if task is not None:
+        if task.get("fire_times") is None and task.get("state") not in _INERT_STATES:
+            # задача из старой версии: расписание ещё не скомпилировано
+            task = _writable(task_id)
+            _compile_reminders(task)
+        for kind, when in _task_timers(task):
+            _timers.insert((task_id, kind), when)
+
+def _reschedule(task_id, wake=True):
+    # вызывается под _lock после каждого изменения задачи
+    task = tasks.get(task_id)
+    _index.update(task_id, task)
+    _changed.add(task_id)
+    _gated.discard(task_id)
+    if task is not None and task.get("state") == "active":
+        _active_ids.add(task_id)
+    elif task_id in _active_ids:
+        _active_ids.discard(task_id)
+        if not _active_ids:
+            for gated_id in _gated:
+                _register_timers(gated_id)
+            _gated.clear()
+    _register_timers(task_id)
+    if wake:
+        _wake_scheduler()
+
+def _reschedule_all():
+    global _publish_all
+    # tasks могли смениться целиком — следующая публикация собирает снимок заново
+    _publish_all = True
+    _timers.clear()
+    _active_ids.clear()
+    _gated.clear()
+    _index.rebuild(tasks.values())
+    for task_id in list(tasks):
+        if tasks[task_id].get("state") == "active":
+            _active_ids.add(task_id)
+        _register_timers(task_id)
+    _wake_scheduler()
+
+def _run_due():
+    """Checks the tasks that have expired timers; returns the next time the wheel needs a tick."""
+    # проснулись сильно позже, чем собирались (сон устройства), или это первый проход после запуска
+    gap = 0 if _expected_wake is None else _clock.time() - _expected_wake
+    catch_up = _expected_wake is None or gap > CATCH_UP_GAP
+    digest = [] if catch_up else None
+    with _lock:
+        now = _now()
+        # несколько сработавших таймеров одной задачи — одна проверка
+        due = dict.fromkeys(task_id for task_id, _ in _timers.advance(now))
+        _stats["passes"] += 1
+        _stats["checked"] += len(due)
+        for task_id in due:
+            if task_id in tasks:
+                _check_task(task_id, now, digest)
+        if _private:
+            _publish()
+        next_time = _timers.next_time()
+    if digest:
+        _send_digest(digest, gap, now)
+    return next_time
+
+def _send_digest(digest, gap, now):
+    global _last_catch_up
+    skipped = sum(count for _, _, _, count in digest)
+    titles = list(dict.fromkeys(task.get("title", "(no title)") for task, _, _, _ in digest))
+    # проход догонки фиксируется всегда, даже если пропущенное уместилось в одно уведомление
+    _last_catch_up = {"time": now, "gap": int(gap), "tasks": len(titles), "skipped": skipped}
+    if len(digest) == 1:
+        task, subject, body, _ = digest[0]
+        _send_task_notification(task, subject, body)
+    else:
+        when = f"after {_format_duration(gap)}" if gap > 0 else "on start"
+        print(f"catch-up {when}: {skipped} notifications for {len(titles)} tasks coalesced")
+        message = f"Пропущено напоминаний: {skipped}, задач: {len(titles)}."
+        if titles:
+            message += " " + ", ".join(titles[:3]) + ("…" if len(titles) > 3 else "")
+        _notify("Пока приложение спало", message)
+    # один раз сохраняем всё, что накопилось за проход
+    _off_loop(flush)
+
+def last_catch_up():
+    """What the last catch-up pass coalesced: time, gap, tasks, skipped; None if there was none."""
+    return _last_catch_up
+
+def _task_notice(digest, task, subject, body, count=1):
+    if digest is None:
+        _send_task_notification(task, subject, body)
+    else:
+        digest.append((task, subject, body, count))
+
+def _repeat_subject(n, offset, period):
+    if period == 3600:
+        return f"Просрочено: {n} час(ов) после первых {offset // 60} минут"
+    return f"Просрочено: повтор {n} после первых {offset // 60} минут"
 
 def _check_all_tasks():
-    now = _now()
-    active_exists = any(t.get("state") == "active" for t in tasks)
-
-    for idx, task in enumerate(tasks):
-        start_time = _as_int(task.get("start_time"))
-        end_time = _as_int(task.get("end_time"))
-        state = task.get("state")
-        reminders = task.setdefault("reminders_sent", {})
-        missed = task.setdefault("missed_notifications", {})
-
-        if state == "next" and start_time is not None:
-            if active_exists:
-                continue
+    """Full pass over every task, regardless of the deadline queue."""
+    with _lock:
+        now = _now()
+        for task_id in list(tasks):
+            _check_task(task_id, now)
+        if _private:
+            _publish()
 
-            t15 = start_time - 15 * 60
-            t10 = start_time - 10 * 60
-            t5 = start_time - 5 * 60
-
-            if now >= start_time:
-                task["state"] = "active"
-                task["started"] = True
-                task["started_time"] = now
-
-                save_tasks()
-                try:
-                    app = MDApp.get_running_app()
-                    if app and hasattr(app, 'refresh_tasks'):
-                        Clock.schedule_once(lambda dt: app.refresh_tasks(), 0)
-                except Exception as e:
-                    print(f"Error scheduling refresh: {e}")
-                active_exists = True
+def _check_task(task_id, now, digest=None):
+    task = tasks[task_id]
+    start_time = _as_int(task.get("start_time"))
+    end_time = _as_int(task.get("end_time"))
+    state = task.get("state")
+
+    if state == "next" and start_time is not None:
+        if _active_ids:
+            # пока есть активная задача, следующие ждут: их снова поставят в очередь, когда она закончится
+            _gated.add(task_id)
+            return
+
+        if now >= start_time:
+            task = _writable(task_id)
+            task["state"] = "active"
+            task["started"] = True
+            task["started_time"] = now
+
+            _journal_edit(task_id, state="active", started=True, started_time=now)
+            _record_fire(start_time, now)
+            _emit_edit(task_id, "next", {"state": "active", "started": True, "started_time": now})
+            _active_ids.add(task_id)
+
+    # скомпилированное расписание: сравниваем только с его началом
+    fire_times = task.get("fire_times")
+    if fire_times and fire_times[0][0] <= now:
+        due = 0
+        while due < len(fire_times) and fire_times[due][0] <= now:
+            due += 1
+        task = _writable(task_id)
+        task["fire_times"] = fire_times[due:]
+        fields = {"fire_times": fire_times[due:]}
+        for ts, code in fire_times[:due]:
+            if code[0] == "b":
+                if task.get("state") != "next":
+                    # задача уже началась, напоминать о старте поздно
+                    continue
+                body = f"Старт через {_format_duration(start_time - now)}."
             else:
-                if now >= t15 and not reminders.get("r15"):
-                    reminders["r15"] = now
-                    save_tasks()
-                    _send_task_notification(task, "Напоминание: 15 минут до старта", f"Старт через {_format_duration(start_time - now)}.")
-                if now >= t10 and not reminders.get("r10"):
-                    reminders["r10"] = now
-                    save_tasks()
-                    _send_task_notification(task, "Напоминание: 10 минут до старта", f"Старт через {_format_duration(start_time - now)}.")
-                if now >= t5 and not reminders.get("r5"):
-                    reminders["r5"] = now
-                    save_tasks()
-                    _send_task_notification(task, "Напоминание: 5 минут до старта", f"Старт через {_format_duration(start_time - now)}.")
-
-        if end_time is not None and state not in ("completed", "completed_overdue"):
-            if now >= end_time:
-                if not missed.get("missed"):
-                    missed["missed"] = now
-                    missed["missed_time"] = now
-                    save_tasks()
-                    _send_task_notification(task, "Дедлайн прошёл", "Вы не успели выполнить задачу до дедлайна.")
-                for mins, key, subj in ((5, "o5", "Просрочено: +5 минут"), (10, "o10", "Просрочено: +10 минут"), (15, "o15", "Просрочено: +15 минут")):
-                    t_check = end_time + mins * 60
-                    if now >= t_check and not missed.get(key):
-                        missed[key] = now
-                        save_tasks()
-                        overdue = now - end_time
-                        _send_task_notification(task, subj, f"Задача просрочена на {_format_duration(overdue)}.")
-                after_hourly_base = end_time + 15 * 60
-                if now >= after_hourly_base:
-                    hours_overdue = int((now - after_hourly_base) // 3600) + 1
-                    last_hour = int(missed.get("last_hour_sent", 0))
-                    while last_hour < hours_overdue:
-                        last_hour += 1
-                        missed["last_hour_sent"] = last_hour
-                        save_tasks()
-                        overdue_total = now - end_time
-                        _send_task_notification(task, f"Просрочено: {last_hour} час(ов) после первых 15 минут", f"Задача просрочена уже на {_format_duration(overdue_total)}.")
-        state = task.get("state")
-        if state == "completed":
-            pass
-        elif state == "completed_overdue":
-            pass
-        elif state == "active":
-            pass
-        elif state == "next":
+                if not task.has_flag("missed"):
+                    # любая ступень после дедлайна означает, что он пропущен (ранние ступени могли быть свёрнуты)
+                    task.set_flag("missed")
+                    task.missed_time = fields["missed_time"] = now
+                if code == "e0":
+                    body = "Вы не успели выполнить задачу до дедлайна."
+                else:
+                    body = f"Задача просрочена на {_format_duration(now - end_time)}."
+            if code in LEGACY_FLAGS:
+                task.set_flag(LEGACY_FLAGS[code])
+                fields["flags"] = task.flags
+            _record_fire(ts, now)
+            _task_notice(digest, task, describe(code), body)
+        _journal_edit(task_id, **fields)
+        _emit("updated", task_id, fields)
+
+    repeat = repeat_base(_rule_for(task), end_time) if state not in _INERT_STATES else None
+    if repeat is not None and now >= repeat[0]:
+        base, period = repeat
+        repeats_due = int((now - base) // period) + 1
+        last_hour = task.last_hour_sent
+        if digest is not None and last_hour < repeats_due:
+            # догоняем за один шаг: одна запись и одна строка в сводке вместо уведомления за каждый час
+            task = _writable(task_id)
+            task.last_hour_sent = repeats_due
+            _journal_edit(task_id, last_hour_sent=repeats_due)
+            _record_fire(base + (repeats_due - 1) * period, now)
+            _emit("updated", task_id, {"last_hour_sent": repeats_due})
+            _task_notice(digest, task, _repeat_subject(repeats_due, base - end_time, period),
+                         f"Задача просрочена уже на {_format_duration(now - end_time)}.", repeats_due - last_hour)
+            last_hour = repeats_due
+        while last_hour < repeats_due:
+            task = _writable(task_id)
+            last_hour += 1
+            task.last_hour_sent = last_hour
+            _journal_edit(task_id, last_hour_sent=last_hour)
+            _record_fire(base + (last_hour - 1) * period, now)
+            _emit("updated", task_id, {"last_hour_sent": last_hour})
+            overdue_total = now - end_time
+            _task_notice(digest, task, _repeat_subject(last_hour, base - end_time, period), f"Задача просрочена уже на {_format_duration(overdue_total)}.")
+    state = task.get("state")
+    if state == "completed":
+        pass
+    elif state == "completed_overdue":
+        pass
+    elif state == "active":
+        pass
+    elif state == "next":
+        pass
+    _reschedule(task_id, wake=False)
+
+
+def serve(once=False, runtime=None):
+    """Headless entry point: loads the store and runs the scheduler without Kivy until SIGINT/SIGTERM.
+
+    ``once`` runs a single pass (catch-up digest included), flushes and returns — for cron.
+    """
+    initialize()
+    if once:
+        _manager_step()
+        flush()
+        _close_dispatcher()
+        return
+    if (runtime or get_manager_runtime()) == "asyncio":
+        asyncio.run(_serve_async())
+        return
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    start_manager()
+    stop.wait()
+    stop_manager()
+
+async def _serve_async():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_manager)
+        except NotImplementedError:
             pass
+    await run_manager_async()
+
+
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(prog="python -m taskManager", description="Task reminders without the UI.")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--once", action="store_true", help="run one scheduler pass and exit (cron)")
+    parser.add_argument("--data-dir", help=f"directory with tasks.json and settings.json (default: ${DATA_DIR_ENV} or ~)")
+    parser.add_argument("--runtime", choices=["thread", "asyncio"], help="default: manager_runtime from settings")
+    args = parser.parse_args()
+    if args.data_dir:
+        os.environ[DATA_DIR_ENV] = args.data_dir
+    serve(once=args.once, runtime=args.runtime)
@@ -0,0 +1,152 @@
+import sys
+
+# флаги отправленных напоминаний, раньше лежали во вложенных словарях reminders_sent / missed_notifications
+FLAG_BITS = {
+    "r15": 1 << 0,
+    "r10": 1 << 1,
+    "r5": 1 << 2,
+    "missed": 1 << 3,
+    "o5": 1 << 4,
+    "o10": 1 << 5,
+    "o15": 1 << 6,
+}
+_REMINDER_FLAGS = ("r15", "r10", "r5")
+_MISSED_FLAGS = ("missed", "o5", "o10", "o15")
+
+FIELDS = (
+    "id", "title", "project", "description", "start_time", "end_time", "started", "state",
+    "created", "completed_time", "started_time", "flags", "missed_time", "last_hour_sent",
+)
+_ZERO_DEFAULTS = ("flags", "last_hour_sent")
+_INTERNED = ("project", "state")
+_FIELD_SET = frozenset(FIELDS)
+
+
+class TaskRecord:
+    """Compact task: one slot per known field instead of a per-task dict.
+
+    Reminder flags are packed into the ``flags`` bitfield, project and state strings are
+    interned. The mapping interface (``get``, ``[]``, ``update``, ``items``...) keeps the
+    old dict-based callers working; unknown keys go to ``extra``.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, None)
+        self.flags = 0
+        self.last_hour_sent = 0
+        self.extra = None
+        self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def copy(self):
+        other = TaskRecord.__new__(TaskRecord)
+        for name in FIELDS:
+            setattr(other, name, getattr(self, name))
+        other.extra = dict(self.extra) if self.extra else None
+        return other
+
+    def has_flag(self, name):
+        return bool(self.flags & FLAG_BITS[name])
+
+    def set_flag(self, name):
+        self.flags |= FLAG_BITS[name]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        elif key in ("reminders_sent", "missed_notifications"):
+            self._set_legacy_flags(value or {})
+        elif value is None:
+            # None у необязательного поля — поле удалено (так оно и приходит в записях журнала)
+            if self.extra and key in self.extra:
+                del self.extra[key]
+                if not self.extra:
+                    self.extra = None
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def _set_legacy_flags(self, legacy):
+        for name, value in legacy.items():
+            if name in FLAG_BITS and value:
+                self.set_flag(name)
+        if legacy.get("missed_time"):
+            self.missed_time = legacy["missed_time"]
+        if legacy.get("last_hour_sent"):
+            self.last_hour_sent = int(legacy["last_hour_sent"])
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if key == "reminders_sent":
+            return {n: True for n in _REMINDER_FLAGS if self.has_flag(n)}
+        if key == "missed_notifications":
+            missed = {n: True for n in _MISSED_FLAGS if self.has_flag(n)}
+            if self.missed_time:
+                missed["missed_time"] = self.missed_time
+            if self.last_hour_sent:
+                missed["last_hour_sent"] = self.last_hour_sent
+            return missed
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        for name in FIELDS:
+            value = getattr(self, name)
+            if value is None or (name in _ZERO_DEFAULTS and not value):
+                continue
+            yield name
+        if self.extra:
+            yield from self.extra
+
+    __iter__ = keys
+
+    def items(self):
+        for key in self.keys():
+            yield key, self[key]
+
+    def values(self):
+        for key in self.keys():
+            yield self[key]
+
+    def update(self, fields=(), **kw):
+        for key, value in dict(fields, **kw).items():
+            self[key] = value
+
+    def __len__(self):
+        return sum(1 for _ in self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (TaskRecord, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TaskRecord({self.to_dict()!r})"
@@ -0,0 +1,151 @@
+"""Notification delivery off the scheduler thread.
+
+``NotificationDispatcher.submit`` only puts the notification into a bounded queue; a
+worker thread hands it to the backend. Notifications that arrive within
+``digest_window`` seconds of each other, or pile up while the rate limit is exhausted,
+are merged into one. ``stats()`` counts queued, delivered, merged, dropped (queue full),
+suppressed (notifications off) and failed (backend error) notifications.
+"""
+import collections
+import queue
+import threading
+import time
+
+
+class StdoutBackend:
+    def send(self, title, message):
+        print(f"[NOTIFY] {title} — {message}")
+
+
+class MemoryBackend:
+    """Keeps delivered notifications in ``sent`` (for tests and the simulation harness)."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, title, message):
+        self.sent.append((title, message))
+
+
+class PlyerBackend:
+    def __init__(self):
+        from plyer import notification
+        self._notification = notification
+
+    def send(self, title, message):
+        self._notification.notify(title=title, message=message)
+
+
+def make_backend(name):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "plyer":
+        try:
+            return PlyerBackend()
+        except Exception as e:
+            print("plyer is not available, notifications go to stdout:", e)
+    return StdoutBackend()
+
+
+class NotificationDispatcher:
+    def __init__(self, backend, queue_size=100, rate_limit=None, digest_window=0, enabled=True):
+        # rate_limit: (сколько уведомлений, за сколько секунд) или None
+        self.backend = backend
+        self.rate_limit = rate_limit
+        self.digest_window = digest_window
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._sent_times = collections.deque()
+        self._counters = collections.Counter()
+        self._counters_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _count(self, name, n=1):
+        with self._counters_lock:
+            self._counters[name] += n
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters["pending"] = self._queue.qsize()
+        return counters
+
+    def submit(self, title, message):
+        """Never blocks; returns False if the notification was dropped."""
+        if not self.enabled:
+            self._count("suppressed")
+            return False
+        try:
+            self._queue.put_nowait((title, message))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def close(self, timeout=1.0):
+        """Delivers what is already queued (up to ``timeout``) and stops the worker."""
+        self._closed = True
+        try:
+            self._queue.put((None, None), timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _drain(self, batch, until):
+        while True:
+            remaining = until - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return True
+            if item[0] is None:
+                return False
+            batch.append(item)
+
+    def _wait_for_rate(self):
+        # когда можно отправить следующее уведомление (time.monotonic())
+        if not self.rate_limit:
+            return time.monotonic()
+        count, per = self.rate_limit
+        now = time.monotonic()
+        while self._sent_times and now - self._sent_times[0] >= per:
+            self._sent_times.popleft()
+        if len(self._sent_times) < count:
+            return now
+        return self._sent_times[0] + per
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            if item[0] is None:
+                break
+            batch = [item]
+            if self.digest_window and not self._closed:
+                running = self._drain(batch, time.monotonic() + self.digest_window)
+            ready_at = self._wait_for_rate()
+            if running and not self._closed and ready_at > time.monotonic():
+                # лимит исчерпан: всё, что придёт за время ожидания, уйдёт одним сообщением
+                running = self._drain(batch, ready_at)
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        if len(batch) == 1:
+            title, message = batch[0]
+        else:
+            title = f"Напоминаний: {len(batch)}"
+            message = "\n".join(t for t, _ in batch[:5]) + ("\n…" if len(batch) > 5 else "")
+            self._count("merged", len(batch))
+        if not self.enabled:
+            self._count("suppressed", len(batch))
+            return
+        try:
+            self.backend.send(title, message)
+            self._sent_times.append(time.monotonic())
+            self._count("delivered", len(batch))
+        except Exception as e:
+            self._count("failed", len(batch))
+            print(f"notification error ({e}): {title} — {message}")
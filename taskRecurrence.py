@@ -0,0 +1,92 @@
+"""Recurrence rules for repeating tasks.
+
+A repeating task is stored once, as a *series*: a template task in the ``"series"`` state
+with a ``recurrence`` rule and the first occurrence's ``start_time``/``end_time``::
+
+    {"freq": "daily", "interval": 1}              каждый день
+    {"freq": "daily", "interval": 3}              каждые 3 дня
+    {"freq": "weekdays"}                          по будням
+    {"freq": "weekly", "days": [0, 2], "interval": 1}   по понедельникам и средам
+
+plus optional ``count`` (number of occurrences) and ``until`` (timestamp, last start).
+``occurrences`` lazily yields start timestamps at the template's local time of day;
+taskManager only turns them into real tasks when they get within the lookahead window,
+so an endless series costs one record.
+"""
+import datetime
+import itertools
+import time
+
+SERIES_STATE = "series"
+FREQUENCIES = ("daily", "weekly", "weekdays")
+WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+def normalize_rule(rule):
+    """Validated copy of ``rule``; raises ValueError for an unknown or empty rule."""
+    if not isinstance(rule, dict) or rule.get("freq") not in FREQUENCIES:
+        raise ValueError(f"bad recurrence rule: {rule!r}")
+    clean = {"freq": rule["freq"], "interval": max(int(rule.get("interval") or 1), 1)}
+    if rule["freq"] == "weekly":
+        days = sorted({int(d) for d in rule.get("days") or ()})
+        if not days or days[0] < 0 or days[-1] > 6:
+            raise ValueError(f"bad recurrence days: {rule.get('days')!r}")
+        clean["days"] = days
+    for key in ("count", "until"):
+        if rule.get(key) is not None:
+            clean[key] = int(rule[key])
+    return clean
+
+
+def _weekdays(rule):
+    return WEEKDAYS if rule["freq"] == "weekdays" else rule.get("days", ())
+
+
+def _periods(rule, first, skip):
+    # (номер вхождения, дата) начиная с периода skip; номер нужен для count
+    interval = rule.get("interval", 1)
+    if rule["freq"] == "daily":
+        for p in itertools.count(skip):
+            yield p, first + datetime.timedelta(days=p * interval)
+    days = _weekdays(rule)
+    week = first - datetime.timedelta(days=first.weekday())
+    first_week = [d for d in days if d >= first.weekday()]
+    for p in itertools.count(skip):
+        n = 0 if p == 0 else len(first_week) + (p - 1) * len(days)
+        for wd in (first_week if p == 0 else days):
+            yield n, week + datetime.timedelta(days=p * 7 * interval + wd)
+            n += 1
+
+
+def occurrences(rule, first_start, after=None):
+    """Start timestamps of the series, in order, strictly after ``after`` (from the first one if None).
+
+    Whole periods before ``after`` are skipped arithmetically, not generated.
+    """
+    first = datetime.datetime.fromtimestamp(first_start)
+    period_days = rule.get("interval", 1) * (1 if rule["freq"] == "daily" else 7)
+    skip = 0
+    if after is not None and after > first_start:
+        skip = max((datetime.date.fromtimestamp(after) - first.date()).days // period_days - 1, 0)
+    count, until = rule.get("count"), rule.get("until")
+    for n, day in _periods(rule, first.date(), skip):
+        if count is not None and n >= count:
+            return
+        # время суток берётся у первого вхождения, переход на летнее время его не сдвигает
+        ts = int(time.mktime(datetime.datetime.combine(day, first.time()).timetuple()))
+        if until is not None and ts > until:
+            return
+        if after is None or ts > after:
+            yield ts
+
+
+def describe(rule):
+    """Short Russian label for the editor."""
+    freq, interval = rule["freq"], rule.get("interval", 1)
+    if freq == "weekdays":
+        return "По будням"
+    if freq == "daily":
+        return "Каждый день" if interval == 1 else f"Каждые {interval} дн."
+    names = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+    days = ", ".join(names[d] for d in rule.get("days", ()))
+    return f"Каждую неделю: {days}" if interval == 1 else f"Раз в {interval} нед.: {days}"
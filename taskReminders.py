@@ -0,0 +1,78 @@
+"""Reminder rules and their compiled fire schedule.
+
+A rule says when to remind about a task, in minutes::
+
+    {"before_start": [15, 10, 5], "after_end": [0, 5, 10, 15], "repeat_minutes": 60}
+
+``after_end`` 0 is the deadline itself; after the last ``after_end`` step a reminder
+repeats every ``repeat_minutes`` (0 or None turns it off). Rules are looked up task ->
+project -> global default (``settings.get_reminder_rules()``) -> DEFAULT_RULE, key by key.
+
+``compile_schedule`` turns the rule into the task's ``fire_times``: a sorted list of
+``[timestamp, code]`` that are still pending ("b15" — 15 minutes before start, "e0" —
+deadline, "e5" — 5 minutes after it). The scheduler only ever looks at the head.
+"""
+DEFAULT_RULE = {"before_start": [15, 10, 5], "after_end": [0, 5, 10, 15], "repeat_minutes": 60}
+
+# коды стандартной лестницы -> старые флаги, чтобы задачи из прежних версий не напоминали повторно
+LEGACY_FLAGS = {"b15": "r15", "b10": "r10", "b5": "r5", "e0": "missed", "e5": "o5", "e10": "o10", "e15": "o15"}
+
+
+def resolve_rule(rules, project=None, task_rule=None):
+    rule = dict(DEFAULT_RULE)
+    rules = rules or {}
+    for layer in (rules.get("default"), (rules.get("projects") or {}).get(project), task_rule):
+        if layer:
+            rule.update((k, v) for k, v in layer.items() if k in DEFAULT_RULE)
+    return rule
+
+
+def _as_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def compile_schedule(task, rule, now):
+    """Pending ``[timestamp, code]`` entries for ``task``, sorted by time.
+
+    Of the entries already in the past only the latest one of each phase (before start /
+    after end) is kept, so a task created or moved late gets one reminder, not a burst.
+    """
+    if task.get("state") in ("completed", "completed_overdue"):
+        return []
+    start_time = _as_int(task.get("start_time"))
+    end_time = _as_int(task.get("end_time"))
+    phases = []
+    if start_time is not None and task.get("state") in (None, "next"):
+        phases.append([(start_time - m * 60, f"b{m}") for m in rule.get("before_start") or ()])
+    if end_time is not None:
+        phases.append([(end_time + m * 60, f"e{m}") for m in rule.get("after_end") or ()])
+    schedule = []
+    for entries in phases:
+        entries = [e for e in entries if not (e[1] in LEGACY_FLAGS and task.has_flag(LEGACY_FLAGS[e[1]]))]
+        entries.sort()
+        past = [e for e in entries if e[0] <= now]
+        schedule.extend(past[-1:])
+        schedule.extend(e for e in entries if e[0] > now)
+    schedule.sort()
+    return [[ts, code] for ts, code in schedule]
+
+
+def repeat_base(rule, end_time):
+    """Start of the repeating overdue reminders and their period in seconds, or None."""
+    period = rule.get("repeat_minutes")
+    if not period or end_time is None:
+        return None
+    return end_time + max(rule.get("after_end") or [0]) * 60, int(period * 60)
+
+
+def describe(code):
+    """Notification subject for a schedule code."""
+    minutes = int(code[1:])
+    if code[0] == "b":
+        return f"Напоминание: {minutes} минут до старта"
+    if minutes == 0:
+        return "Дедлайн прошёл"
+    return f"Просрочено: +{minutes} минут"
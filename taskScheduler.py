@@ -0,0 +1,135 @@
+import time
+
+
+class WallClock:
+    """Real time; what the scheduler uses unless a test or simulation swaps it out."""
+
+    def time(self):
+        return time.time()
+
+
+class VirtualClock:
+    """Clock that only moves when told to (simulations, time-travel tests)."""
+
+    def __init__(self, now=0.0):
+        self.now = float(now)
+
+    def time(self):
+        return self.now
+
+    def set(self, now):
+        self.now = max(self.now, float(now))
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with one-second ticks.
+
+    ``LEVELS`` wheels of ``SLOTS`` slots each; a timer lives in the level of the highest
+    6-bit group where its time differs from the wheel's current time and is cascaded one
+    level down when the clock reaches that slot. ``insert`` and ``cancel`` are O(1);
+    ``advance`` returns every timer that expired, as one batch.
+    """
+
+    BITS = 6
+    SLOTS = 1 << BITS
+    LEVELS = 6
+
+    def __init__(self, now=0):
+        self.now = int(now)
+        self._slots = [[{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        self._where = {}
+        self._ready = {}
+        # дальше 2**36 секунд колёса не достают (это тысячи лет) — такие таймеры просто лежат
+        self._far = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def insert(self, key, when):
+        # горячий путь (регистрация всех задач при загрузке): cancel встроен, атрибуты читаются один раз
+        when = int(when)
+        where = self._where
+        old = where.get(key)
+        if old is not None:
+            del old[key]
+        if when <= self.now:
+            slot = self._ready
+        else:
+            bits = self.BITS
+            level = ((when ^ self.now).bit_length() - 1) // bits
+            if level >= self.LEVELS:
+                slot = self._far
+            else:
+                slot = self._slots[level][(when >> (bits * level)) & (self.SLOTS - 1)]
+        slot[key] = when
+        where[key] = slot
+
+    def cancel(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del slot[key]
+
+    def clear(self):
+        for level in self._slots:
+            for slot in level:
+                slot.clear()
+        self._where.clear()
+        self._ready.clear()
+        self._far.clear()
+
+    def next_time(self):
+        """Time of the next expiry or cascade; the caller should call ``advance`` then."""
+        if self._ready:
+            return self.now
+        for level in range(self.LEVELS):
+            shift = self.BITS * level
+            slots = self._slots[level]
+            base = (self.now >> (shift + self.BITS)) << (shift + self.BITS)
+            for i in range(((self.now >> shift) & (self.SLOTS - 1)) + 1, self.SLOTS):
+                if slots[i]:
+                    return base | (i << shift)
+        return None
+
+    def advance(self, now):
+        """Moves the clock to ``now``; returns the keys of expired timers, earliest first."""
+        expired = list(self._ready)
+        for key in expired:
+            del self._where[key]
+        self._ready.clear()
+        while True:
+            t = self.next_time()
+            if t is None or t > now:
+                break
+            self._step(t, expired)
+        self.now = max(self.now, int(now))
+        return expired
+
+    def _step(self, t, expired):
+        self.now = t
+        for level in range(self.LEVELS - 1, 0, -1):
+            shift = self.BITS * level
+            if t & ((1 << shift) - 1) == 0:
+                slot = self._slots[level][(t >> shift) & (self.SLOTS - 1)]
+                if slot:
+                    cascaded = list(slot.items())
+                    slot.clear()
+                    for key, when in cascaded:
+                        del self._where[key]
+                        self.insert(key, when)
+        if self._ready:
+            expired.extend(self._ready)
+            for key in self._ready:
+                del self._where[key]
+            self._ready.clear()
+        slot = self._slots[0][t & (self.SLOTS - 1)]
+        if slot:
+            expired.extend(slot)
+            for key in slot:
+                del self._where[key]
+            slot.clear()
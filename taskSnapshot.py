@@ -0,0 +1,256 @@
+"""Binary task snapshot, read through mmap.
+
+Layout (native byte order, recorded in the header; every section 8-byte aligned)::
+
+    header      magic, version, byte order, row count, seq, max_id, hot, string count
+    int64 cols  id, start_time, end_time, created, completed_time, started_time, missed_time
+    uint32 cols flags, last_hour_sent, title, project, description, extra   (strings: table index)
+    uint8 cols  state (index in STATES), started (0/1, 2 = unset)
+    strings     uint32 offsets[count + 1], then the utf-8 blob
+
+Columns are exposed as zero-copy memoryviews over the mapping, so reading one column
+(or the hot rows at the head) only touches those pages.
+
+    python taskSnapshot.py convert tasks.json tasks.bin
+    python taskSnapshot.py convert tasks.bin tasks.json
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from taskModel import TaskRecord
+
+MAGIC = b"TMSNAP\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQII")
+STATES = ("next", "active", "completed", "completed_overdue")
+HOT_STATES = ("active", "next")
+_STATE_INDEX = {s: i for i, s in enumerate(STATES)}
+
+INT_COLUMNS = ("id", "start_time", "end_time", "created", "completed_time", "started_time", "missed_time")
+UINT_COLUMNS = ("flags", "last_hour_sent")
+STRING_COLUMNS = ("title", "project", "description", "extra")
+BYTE_COLUMNS = ("state", "started")
+
+NULL_INT = -2 ** 63
+NULL_STR = 0xFFFFFFFF
+UNSET_STATE = 0xFF
+UNSET_BOOL = 2
+
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+
+def _int_or_null(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return NULL_INT
+
+
+def write_snapshot(path, data):
+    """Writes ``data`` (the dict compact() builds: seq, hot, max_id, tasks) atomically."""
+    rows = data["tasks"]
+    n = len(rows)
+    strings = []
+    string_index = {}
+
+    def intern_str(s):
+        if s is None:
+            return NULL_STR
+        i = string_index.get(s)
+        if i is None:
+            i = string_index[s] = len(strings)
+            strings.append(s)
+        return i
+
+    ints = {c: array("q") for c in INT_COLUMNS}
+    uints = {c: array("I") for c in UINT_COLUMNS + STRING_COLUMNS}
+    states = bytearray(n)
+    started = bytearray(n)
+    for r, task in enumerate(rows):
+        get = task.get
+        for c in INT_COLUMNS:
+            ints[c].append(_int_or_null(get(c)))
+        uints["flags"].append(int(get("flags") or 0))
+        uints["last_hour_sent"].append(int(get("last_hour_sent") or 0))
+        uints["title"].append(intern_str(get("title")))
+        uints["project"].append(intern_str(get("project")))
+        uints["description"].append(intern_str(get("description")))
+        extra = {k: v for k, v in task.items() if k not in _KNOWN}
+        state = get("state")
+        states[r] = _STATE_INDEX.get(state, UNSET_STATE)
+        if state is not None and state not in _STATE_INDEX:
+            extra["state"] = state
+        s = get("started")
+        started[r] = UNSET_BOOL if s is None else int(bool(s))
+        uints["extra"].append(intern_str(json.dumps(extra, ensure_ascii=False)) if extra else NULL_STR)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 1 if sys.byteorder == "little" else 0, n,
+                            int(data.get("seq", 0)), int(data.get("max_id", 0)), int(data.get("hot", 0)),
+                            len(strings)))
+        for c in INT_COLUMNS:
+            f.write(ints[c].tobytes())
+        for c in UINT_COLUMNS + STRING_COLUMNS:
+            f.write(uints[c].tobytes())
+        f.write(bytes(states))
+        f.write(bytes(started))
+        f.write(b"\0" * _pad(n * 2))
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+_KNOWN = frozenset(INT_COLUMNS + UINT_COLUMNS + STRING_COLUMNS + BYTE_COLUMNS)
+
+
+class BinarySnapshot:
+    """Read side of the binary snapshot, same interface as ``taskStorage.SnapshotReader``."""
+
+    def __init__(self, path):
+        self._f = open(path, "rb")
+        self.total_bytes = os.path.getsize(path)
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little, n, seq, max_id, hot, nstrings = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a task snapshot (version {version})")
+        if bool(little) != (sys.byteorder == "little"):
+            self.close()
+            raise ValueError(f"{path}: written on a machine with different byte order")
+        self.header = {"version": version, "seq": seq, "max_id": max_id, "hot": hot}
+        self._n = n
+        self.bytes_read = 0
+        view = memoryview(self._mm)
+        self._views = [view]
+        off = HEADER.size
+        self._cols = {}
+        for c in INT_COLUMNS:
+            self._cols[c] = self._view(view, off, n * 8, "q")
+            off += n * 8
+        for c in UINT_COLUMNS + STRING_COLUMNS:
+            self._cols[c] = self._view(view, off, n * 4, "I")
+            off += n * 4
+        for c in BYTE_COLUMNS:
+            self._cols[c] = self._view(view, off, n, "B")
+            off += n
+        off += _pad(off - HEADER.size)
+        self._offsets = self._view(view, off, (nstrings + 1) * 4, "I")
+        self._blob = off + (nstrings + 1) * 4
+        self._strings = [None] * nstrings
+
+    def _view(self, view, off, size, fmt):
+        v = view[off:off + size].cast(fmt)
+        self._views.append(v)
+        return v
+
+    def __len__(self):
+        return self._n
+
+    def column(self, name):
+        """Zero-copy view of a fixed-width column."""
+        return self._cols[name]
+
+    def string(self, i):
+        if i == NULL_STR:
+            return None
+        s = self._strings[i]
+        if s is None:
+            start, end = self._offsets[i], self._offsets[i + 1]
+            s = self._strings[i] = str(self._mm[self._blob + start:self._blob + end], "utf-8")
+        return s
+
+    def row(self, r):
+        cols = self._cols
+        task = TaskRecord()
+        for c in INT_COLUMNS:
+            v = cols[c][r]
+            if v != NULL_INT:
+                setattr(task, c, v)
+        task.flags = cols["flags"][r]
+        task.last_hour_sent = cols["last_hour_sent"][r]
+        task.title = self.string(cols["title"][r])
+        task.project = self.string(cols["project"][r])
+        task.description = self.string(cols["description"][r])
+        state = cols["state"][r]
+        if state != UNSET_STATE:
+            task.state = STATES[state]
+        started = cols["started"][r]
+        if started != UNSET_BOOL:
+            task.started = bool(started)
+        extra = cols["extra"][r]
+        if extra != NULL_STR:
+            task.update(json.loads(self.string(extra)))
+        return task
+
+    def __iter__(self):
+        for r in range(self._n):
+            self.bytes_read = self.total_bytes * (r + 1) // max(self._n, 1)
+            yield self.row(r)
+
+    def close(self):
+        for v in reversed(getattr(self, "_views", [])):
+            v.release()
+        self._views = []
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"seq": 0, "tasks": data}
+    return data
+
+
+def save_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp, path)
+
+
+def load_binary(path):
+    snap = BinarySnapshot(path)
+    try:
+        return dict(snap.header, tasks=[t.to_dict() for t in snap])
+    finally:
+        snap.close()
+
+
+def convert(src, dst):
+    data = load_binary(src) if src.endswith(".bin") else load_json(src)
+    if dst.endswith(".bin"):
+        tasks = data["tasks"]
+        if "hot" not in data:
+            # тот же порядок, что пишет JournalStore.compact(): активные и следующие в начале
+            tasks.sort(key=lambda t: t.get("state") not in HOT_STATES)
+            data["hot"] = sum(1 for t in tasks if t.get("state") in HOT_STATES)
+        data.setdefault("max_id", max((t.get("id") or 0 for t in tasks), default=0))
+        write_snapshot(dst, data)
+    else:
+        save_json(dst, data)
+    return len(data["tasks"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("usage: python taskSnapshot.py convert <in.json|in.bin> <out.json|out.bin>")
+        sys.exit(2)
+    print(f"converted {convert(sys.argv[2], sys.argv[3])} tasks")
@@ -0,0 +1,683 @@
+import codecs
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from taskModel import TaskRecord
+from taskSnapshot import BinarySnapshot, HOT_STATES, write_snapshot
+
+SNAPSHOT_VERSION = 1
+COMPACT_THRESHOLD = 500
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BATCH = 500
+
+
+def _atomic_write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_journal(path):
+    """Records of a journal file.
+
+    A torn tail left by a crash is cut off the file, so the next append starts on a clean
+    line instead of being glued to the broken one; a bad line in the middle is skipped.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    good_end = end = 0
+    torn = newline = False
+    with open(path, "rb") as f:
+        for raw in f:
+            end += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                torn = True
+                continue
+            if torn:
+                print(f"journal {path}: skipped a damaged record before byte {end - len(raw)}")
+                torn = False
+            good_end, newline = end, raw.endswith(b"\n")
+    if torn:
+        # недописанная последняя строка после падения
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    if good_end and not newline and not torn:
+        with open(path, "ab") as f:
+            f.write(b"\n")
+    return records
+
+
+_WS = re.compile(r"\s*")
+
+
+class SnapshotReader:
+    """Incremental snapshot parser: reads the file in chunks and decodes one task object at a time.
+
+    ``header`` holds the keys written before ``"tasks"``; a legacy snapshot that is a bare
+    list has an empty header. ``bytes_read`` / ``total_bytes`` give load progress.
+    """
+
+    def __init__(self, path, chunk_size=STREAM_CHUNK_SIZE):
+        self._f = open(path, "rb")
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.total_bytes = os.path.getsize(path)
+        self.bytes_read = 0
+        self.header = {}
+        self._no_tasks = False
+        self._read_header()
+
+    def _fill(self):
+        if self._eof:
+            return False
+        raw = self._f.read(self._chunk_size)
+        self.bytes_read += len(raw)
+        if not raw:
+            self._eof = True
+        self._buf = self._buf[self._pos:] + self._utf8.decode(raw, final=not raw)
+        self._pos = 0
+        return bool(raw)
+
+    def _peek(self):
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, ch):
+        if self._peek() != ch:
+            raise ValueError(f"snapshot: expected {ch!r} at {self.bytes_read}")
+        self._pos += 1
+
+    def _decode(self):
+        while True:
+            self._peek()
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # число могло оборваться на границе чанка — дочитываем, пока за значением что-то есть
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _read_header(self):
+        ch = self._peek()
+        if ch == "[":
+            self._pos += 1
+            return
+        self._expect("{")
+        while True:
+            ch = self._peek()
+            if ch == "}" or ch is None:
+                self._no_tasks = True
+                return
+            if ch == ",":
+                self._pos += 1
+                continue
+            key = self._decode()
+            self._expect(":")
+            if key == "tasks":
+                self._expect("[")
+                return
+            self.header[key] = self._decode()
+
+    def __iter__(self):
+        if self._no_tasks:
+            return
+        while True:
+            ch = self._peek()
+            if ch == "]" or ch is None:
+                return
+            if ch == ",":
+                self._pos += 1
+                continue
+            yield self._decode()
+
+    def close(self):
+        self._f.close()
+
+
+def index_tasks(task_list):
+    """Builds the id -> task dict, assigning ids to legacy tasks that have none."""
+    tasks = {}
+    next_id = max((t["id"] for t in task_list if isinstance(t.get("id"), int)), default=0) + 1
+    for data in task_list:
+        task = TaskRecord.from_dict(data)
+        if not isinstance(task.id, int) or task.id in tasks:
+            task.id = next_id
+            next_id += 1
+        tasks[task.id] = task
+    return tasks
+
+
+def _record_task_id(tasks, record):
+    if "id" in record:
+        return record["id"]
+    # журналы до появления id адресовали задачи позицией в списке
+    i = record.get("index", -1)
+    if 0 <= i < len(tasks):
+        return list(tasks)[i]
+    return None
+
+
+def _added_id(record):
+    if record.get("op") == "add" and isinstance(record["task"].get("id"), int):
+        return record["task"]["id"]
+    return 0
+
+
+def apply_record(tasks, record):
+    op = record.get("op")
+    if op == "add":
+        task = TaskRecord.from_dict(record["task"])
+        if not isinstance(task.id, int):
+            task.id = max(tasks, default=0) + 1
+        tasks[task.id] = task
+    elif op == "edit":
+        task = tasks.get(_record_task_id(tasks, record))
+        if task is not None:
+            task.update(record.get("fields", {}))
+    elif op == "delete":
+        tasks.pop(_record_task_id(tasks, record), None)
+
+
+class JournalStore:
+    """Snapshot (tasks.json) plus an append-only journal of small mutation records.
+
+    Every mutation appends one JSON line to ``<snapshot>.journal``. Once the journal
+    grows past ``compact_threshold`` records it is rotated and a background thread
+    folds the current state into a new snapshot. With ``snapshot_format="binary"`` the
+    snapshot is ``tasks.bin`` (see taskSnapshot). When the format changes, the snapshot in
+    the other format (tasks.json <-> tasks.bin) is imported on first load and deleted
+    once the next compaction has written the new one, so no stale copy stays on disk.
+
+    ``max_id`` is the highest id ever handed out. It is kept in the snapshot header and
+    only grows, so ids of deleted or archived tasks are never reused.
+    """
+
+    def __init__(self, snapshot_path, compact_threshold=COMPACT_THRESHOLD, snapshot_format="json"):
+        self.snapshot_path = snapshot_path
+        self.binary = snapshot_format == "binary"
+        self.data_path = os.path.splitext(snapshot_path)[0] + ".bin" if self.binary else snapshot_path
+        self.other_path = snapshot_path if self.binary else os.path.splitext(snapshot_path)[0] + ".bin"
+        self._importing = False
+        self.journal_path = snapshot_path + ".journal"
+        self.rotated_path = snapshot_path + ".journal.old"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._pending = 0
+        self._compactor = None
+        self.max_id = 0
+
+    @staticmethod
+    def _header_seq(path, binary):
+        try:
+            reader = BinarySnapshot(path) if binary else SnapshotReader(path)
+        except Exception:
+            return -1
+        try:
+            return int(reader.header.get("seq", 0))
+        finally:
+            reader.close()
+
+    def _source(self):
+        """(path, binary) of the snapshot to load; path is None when there is none.
+
+        Normally our own format. While switching formats the other file is used if it is
+        newer (higher ``seq``); a copy that is not newer is stale and is deleted here.
+        """
+        own = os.path.exists(self.data_path)
+        other = os.path.exists(self.other_path)
+        self._importing = other and (not own or self._header_seq(self.other_path, not self.binary) >
+                                     self._header_seq(self.data_path, self.binary))
+        if self._importing:
+            return self.other_path, not self.binary
+        if other:
+            try:
+                os.remove(self.other_path)
+            except OSError as e:
+                print("stale snapshot cleanup error:", e)
+        return (self.data_path if own else None), self.binary
+
+    def _open_reader(self):
+        path, binary = self._source()
+        if path is None:
+            return None
+        return BinarySnapshot(path) if binary else SnapshotReader(path)
+
+    def _imported(self):
+        # снимка в нашем формате ещё нет — первый же append запустит компакцию
+        return self._importing
+
+    def load(self):
+        task_list = []
+        snapshot_seq = max_id = 0
+        path, binary = self._source()
+        if path is not None and binary:
+            try:
+                snap = BinarySnapshot(path)
+                try:
+                    task_list = list(snap)
+                    snapshot_seq = int(snap.header.get("seq", 0))
+                    max_id = int(snap.header.get("max_id", 0))
+                finally:
+                    snap.close()
+            except Exception as e:
+                print("binary snapshot error:", e)
+                task_list = []
+        elif path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    task_list = data
+                else:
+                    task_list = data.get("tasks", [])
+                    snapshot_seq = int(data.get("seq", 0))
+                    max_id = int(data.get("max_id", 0))
+            except Exception:
+                task_list = []
+        tasks = index_tasks(task_list)
+        self._seq = snapshot_seq
+        replayed = 0
+        for path in (self.rotated_path, self.journal_path):
+            for record in _read_journal(path):
+                seq = record.get("seq", 0)
+                if seq <= snapshot_seq:
+                    continue
+                apply_record(tasks, record)
+                self._seq = max(self._seq, seq)
+                replayed += 1
+                max_id = max(max_id, _added_id(record))
+        self.max_id = max(max_id, max(tasks, default=0))
+        self._pending = self.compact_threshold if self._imported() else replayed
+        return tasks
+
+    def stream(self, batch_size=STREAM_BATCH):
+        """Loads the snapshot incrementally.
+
+        Yields ``("hot", tasks, max_id)`` first (``max_id`` as in the class docstring): the active/next tasks that compact() writes
+        at the head of the file, plus tasks added after the snapshot. Then yields
+        ``("batch", tasks, bytes_read, total_bytes)`` for the rest. Journal records are
+        applied to each task as it is parsed. Legacy snapshots without a ``hot`` header
+        are loaded in one go.
+        """
+        reader = self._open_reader()
+        snapshot_seq = int(reader.header.get("seq", 0)) if reader else 0
+        records = [r for path in (self.rotated_path, self.journal_path) for r in _read_journal(path)
+                   if r.get("seq", 0) > snapshot_seq]
+        if reader is None or "hot" not in reader.header or any("id" not in r for r in records
+                                                                if r.get("op") != "add"):
+            if reader is not None:
+                reader.close()
+            tasks = self.load()
+            yield "hot", list(tasks.values()), self.max_id
+            return
+
+        self._seq = max([snapshot_seq] + [r["seq"] for r in records])
+        self._pending = self.compact_threshold if self._imported() else len(records)
+        by_id = {}
+        for r in records:
+            task_id = r["task"].get("id") if r.get("op") == "add" else r["id"]
+            by_id.setdefault(task_id, []).append(r)
+
+        def settle(task):
+            for r in by_id.pop(task.id, ()):
+                if r["op"] == "edit":
+                    task.update(r.get("fields", {}))
+                elif r["op"] == "delete":
+                    return None
+            return task
+
+        rows = iter(reader)
+        hot = []
+        for data in itertools.islice(rows, int(reader.header["hot"])):
+            task = settle(TaskRecord.from_dict(data))
+            if task is not None:
+                hot.append(task)
+        max_id = int(reader.header.get("max_id", 0))
+        # задачи, добавленные после снимка, есть только в журнале
+        for task_id, recs in list(by_id.items()):
+            if recs[0].get("op") == "add":
+                by_id[task_id] = recs[1:]
+                task = settle(TaskRecord.from_dict(recs[0]["task"]))
+                max_id = max(max_id, task_id)
+                if task is not None:
+                    hot.append(task)
+        self.max_id = max_id
+        yield "hot", hot, max_id
+
+        batch = []
+        for data in rows:
+            task = settle(TaskRecord.from_dict(data))
+            if task is not None:
+                batch.append(task)
+            if len(batch) >= batch_size:
+                yield "batch", batch, reader.bytes_read, reader.total_bytes
+                batch = []
+        reader.close()
+        yield "batch", batch, reader.total_bytes, reader.total_bytes
+
+    def append(self, record):
+        return self.append_many([record])
+
+    def append_many(self, records):
+        with self._lock:
+            lines = []
+            for record in records:
+                self._seq += 1
+                self.max_id = max(self.max_id, _added_id(record))
+                lines.append(json.dumps(dict(record, seq=self._seq), ensure_ascii=False))
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self._pending += len(records)
+            return self._pending >= self.compact_threshold
+
+    def compact(self, tasks, background=True):
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.rotated_path):
+                    # предыдущая компакция не дошла до конца — дописываем хвост к старому журналу
+                    with open(self.journal_path, "r", encoding="utf-8") as src, \
+                            open(self.rotated_path, "a", encoding="utf-8") as dst:
+                        dst.write(src.read())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.rotated_path)
+            # активные и следующие задачи идут в начале файла, чтобы stream() отдал их первыми
+            hot = [t for t in tasks.values() if t.get("state") in HOT_STATES]
+            cold = [t for t in tasks.values() if t.get("state") not in HOT_STATES]
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "seq": self._seq,
+                "hot": len(hot),
+                "max_id": max(self.max_id, max(tasks, default=0)),
+                "tasks": [t.to_dict() for t in hot + cold],
+            }
+            self._pending = 0
+
+        if background:
+            self._compactor = threading.Thread(target=self._write_snapshot, args=(data,), daemon=True)
+            self._compactor.start()
+        else:
+            self._write_snapshot(data)
+
+    def _write_snapshot(self, data):
+        try:
+            if self.binary:
+                write_snapshot(self.data_path, data)
+            else:
+                _atomic_write_json(self.snapshot_path, data)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            if os.path.exists(self.other_path):
+                # снимок прежнего формата перенесён целиком — устаревшая копия не нужна
+                os.remove(self.other_path)
+                self._importing = False
+        except Exception as e:
+            print("compaction error:", e)
+
+    def wait(self):
+        t = self._compactor
+        if t is not None:
+            t.join()
+
+
+_COLUMNS = ("title", "project", "description", "start_time", "end_time", "started", "state",
+            "created", "completed_time", "started_time")
+
+
+class SqliteStore:
+    """Task store backed by stdlib sqlite3 (WAL mode), one row per task.
+
+    Keeps the same record interface as :class:`JournalStore`; the in-memory dict in
+    ``taskManager`` stays the read model (queries go through taskIndex) and the row id is
+    the task id.
+    """
+
+    def __init__(self, db_path, json_path=None):
+        self.snapshot_path = json_path
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        migrate = json_path is not None and not os.path.exists(db_path) and os.path.exists(json_path)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if migrate:
+            migrate_json_to_sqlite(json_path, self)
+
+    def _create_schema(self):
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "title TEXT, project TEXT, description TEXT, "
+                "start_time INTEGER, end_time INTEGER, started INTEGER, state TEXT, "
+                "created INTEGER, completed_time INTEGER, started_time INTEGER, "
+                "extra TEXT)"
+            )
+            # выборки по состоянию и времени отвечает TaskIndex в памяти; индексы из прежних версий
+            # только замедляли запись
+            for name in ("idx_tasks_state", "idx_tasks_start", "idx_tasks_end"):
+                self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    @staticmethod
+    def _split(task):
+        values = []
+        for col in _COLUMNS:
+            v = task.get(col)
+            if col == "started" and v is not None:
+                v = int(bool(v))
+            values.append(v)
+        extra = {k: v for k, v in task.items() if k not in _COLUMNS and k != "id"}
+        return values, json.dumps(extra, ensure_ascii=False) if extra else None
+
+    @staticmethod
+    def _row_to_task(row):
+        task = TaskRecord(id=row[0])
+        for col, v in zip(_COLUMNS, row[1:-1]):
+            if v is None:
+                continue
+            task[col] = bool(v) if col == "started" else v
+        if row[-1]:
+            task.update(json.loads(row[-1]))
+        return task
+
+    def _select(self, where="", params=()):
+        sql = "SELECT id, " + ", ".join(_COLUMNS) + ", extra FROM tasks " + where
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def max_id(self):
+        # AUTOINCREMENT ведёт sqlite_sequence: наибольший id, когда-либо записанный, в том числе удалённый
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'").fetchone()
+        return row[0] if row else 0
+
+    def load(self):
+        rows = self._select("ORDER BY id")
+        return {r[0]: self._row_to_task(r) for r in rows}
+
+    def insert(self, task):
+        self.insert_many([task])
+
+    def insert_many(self, tasks):
+        """Inserts (or replaces) tasks in one transaction."""
+        rows = []
+        for task in tasks:
+            values, extra = self._split(task)
+            rows.append([task.get("id")] + values + [extra])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (id, " + ", ".join(_COLUMNS) + ", extra) VALUES (" +
+                ", ".join("?" * (len(_COLUMNS) + 2)) + ")",
+                rows
+            )
+
+    def append_many(self, records):
+        for record in records:
+            self.append(record)
+        return False
+
+    def append(self, record):
+        op = record.get("op")
+        if op == "add":
+            self.insert(record["task"])
+        elif op == "edit":
+            self._update(record["id"], record.get("fields", {}))
+        elif op == "delete":
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM tasks WHERE id = ?", (record["id"],))
+        return False
+
+    def _update(self, row_id, fields):
+        cols = {k: v for k, v in fields.items() if k in _COLUMNS}
+        extra = {k: v for k, v in fields.items() if k not in _COLUMNS}
+        with self._lock, self._conn:
+            if cols:
+                if "started" in cols:
+                    cols["started"] = int(bool(cols["started"]))
+                self._conn.execute(
+                    "UPDATE tasks SET " + ", ".join(f"{k} = ?" for k in cols) + " WHERE id = ?",
+                    list(cols.values()) + [row_id]
+                )
+            if extra:
+                row = self._conn.execute("SELECT extra FROM tasks WHERE id = ?", (row_id,)).fetchone()
+                merged = json.loads(row[0]) if row and row[0] else {}
+                merged.update(extra)
+                self._conn.execute("UPDATE tasks SET extra = ? WHERE id = ?",
+                                   (json.dumps(merged, ensure_ascii=False), row_id))
+
+    def compact(self, tasks, background=True):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def wait(self):
+        pass
+
+
+def _coalesce(records):
+    out = []
+    for record in records:
+        prev = out[-1] if out else None
+        if prev is not None and record.get("op") == "edit" and prev.get("op") == "edit" \
+                and prev.get("id") == record.get("id"):
+            prev["fields"] = dict(prev["fields"], **record.get("fields", {}))
+        else:
+            out.append(dict(record))
+    return out
+
+
+class WriteBehind:
+    """Buffers store records and flushes them from a background writer once per ``window`` seconds.
+
+    A burst of mutations becomes a single ``append_many`` call; consecutive edits of the
+    same task are merged into one record. ``snapshot`` returns the current task list for
+    compaction and ``mutation_lock`` is the lock the owner holds while mutating it, so a
+    snapshot never includes changes whose records are still buffered.
+    """
+
+    def __init__(self, store, window=1.0, snapshot=None, mutation_lock=None):
+        self.store = store
+        self.window = window
+        self._snapshot = snapshot
+        self._mutation_lock = mutation_lock or threading.RLock()
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._dirty = threading.Event()
+        self._needs_compaction = False
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def append(self, record):
+        with self._lock:
+            self._buffer.append(record)
+        self._dirty.set()
+        return False
+
+    def compact(self, tasks, background=True):
+        if background:
+            self._needs_compaction = True
+            self._dirty.set()
+        else:
+            with self._mutation_lock:
+                self._flush_locked()
+                self.store.compact(tasks, background=False)
+
+    def flush(self):
+        with self._mutation_lock:
+            self._flush_locked()
+            if self._needs_compaction and self._snapshot is not None:
+                tasks = self._snapshot()
+                # None — владелец ещё не догрузил задачи, неполный снимок писать нельзя
+                if tasks is not None:
+                    self._needs_compaction = False
+                    self.store.compact(tasks)
+
+    def _flush_locked(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch and self.store.append_many(_coalesce(batch)):
+            self._needs_compaction = True
+
+    def _writer_loop(self):
+        while self._running:
+            self._dirty.wait()
+            if not self._running:
+                break
+            time.sleep(self.window)
+            self._dirty.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print("write-behind flush error:", e)
+
+    def close(self):
+        self._running = False
+        self._dirty.set()
+        self.flush()
+        self.store.wait()
+
+    def wait(self):
+        self.flush()
+        self.store.wait()
+
+
+def migrate_json_to_sqlite(json_path, store):
+    tasks = JournalStore(json_path).load()
+    # одна транзакция: без неё каждая строка — отдельный коммит и fsync
+    store.insert_many(tasks.values())
+    print(f"Migrated {len(tasks)} tasks from {json_path} to {store.db_path}")
+    return len(tasks)